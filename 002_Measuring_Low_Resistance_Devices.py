@@ -26,7 +26,6 @@
 # ********************************************************************************
 import KeithleySeries2400InteractiveSmu as KeiSmu
 import KeithleySeries2400InteractiveSmu_Constants as smuconst
-import time
 
 mysmu = KeiSmu.KeithleySeries2400InteractiveSmu()
 
@@ -51,21 +50,17 @@ mysmu.source.output = smuconst.ON
 
 # Initiate trigger model and wait until finished.
 mysmu.trigger.model.initiate()
-# mysmu.waitcomplete()
-time.sleep(0.1)
-trig_state = mysmu.trigger.model.state
-while trig_state is smuconst.TRIGGER_STATE_RUNNING:
-    time.sleep(0.1)
-    trig_state = mysmu.trigger.model.state
+mysmu.trigger.model.wait_for_idle()
 
 # Turn off output
 mysmu.source.output = smuconst.OFF
 
 # Read the resistance and time values from defbuffer1.
+data = mysmu.fetch("defbuffer1", 1, 100,
+                   columns=["readings", "relativetimestamps"])
 print("Resistance: \tTime: ")
-for i in range(1, 100, 1):
-    reading_val = mysmu.get_buffer_value("defbuffer1", i, readings=True)
-    reltime_val = mysmu.get_buffer_value("defbuffer1", i, relativetimestamps=True)
-    print(reading_val + ", " + reltime_val)
+for reading_val, reltime_val in zip(data["readings"],
+                                    data["relativetimestamps"]):
+    print(f"{reading_val}, {reltime_val}")
 
 mysmu.close()
@@ -34,28 +34,26 @@ mysmu.initialize("USB0::0x05E6::0x2460::04312353::INSTR")
 #  Reset the instrument to the default settings
 mysmu.reset()
 
-# Set up the source function.
-mysmu.source.func = smuconst.FUNC_DC_VOLTAGE
-mysmu.source.ilimit.level = 10e-3
-mysmu.source.level = 20
+# Send the whole setup to the instrument as a single chunk.
+with mysmu.batch():
+    # Set up the source function.
+    mysmu.source.func = smuconst.FUNC_DC_VOLTAGE
+    mysmu.source.ilimit.level = 10e-3
+    mysmu.source.level = 20
 
-# Set up the measure function
-mysmu.measure.function = smuconst.FUNC_DC_CURRENT
-mysmu.terminals = smuconst.TERMINALS_REAR
-mysmu.measure.autorange = smuconst.ON
-mysmu.measure.nplc = 1.0
+    # Set up the measure function
+    mysmu.measure.function = smuconst.FUNC_DC_CURRENT
+    mysmu.terminals = smuconst.TERMINALS_REAR
+    mysmu.measure.autorange = smuconst.ON
+    mysmu.measure.nplc = 1.0
 
-# Turn on the output and initiate readings.
-mysmu.source.output = smuconst.ON
-mysmu.trigger.model.load_duration_loop(60, 0.2)
+    # Turn on the output and initiate readings.
+    mysmu.source.output = smuconst.ON
+    mysmu.trigger.model.load_duration_loop(60, 0.2)
 
 # Initiate trigger model and wait until finished.
 mysmu.trigger.model.initiate()
-time.sleep(0.1)
-trig_state = mysmu.trigger.model.state
-while trig_state is smuconst.TRIGGER_STATE_RUNNING:
-    time.sleep(0.1)
-    trig_state = mysmu.trigger.model.state
+mysmu.trigger.model.wait_for_idle()
 
 # Discharge the capacitor to 0 V and turn off the output.
 mysmu.source.level = 0
@@ -63,10 +61,11 @@ time.sleep(2.0)
 mysmu.source.output = smuconst.OFF
 
 # Read the resistance and time values from defbuffer1.
+data = mysmu.fetch("defbuffer1",
+                   columns=["readings", "relativetimestamps"])
 print("Reading #\tResistance\tTime")
-for i in range(1, mysmu.get_buffer_reading_count()+1, 1):
-    reading_val = mysmu.get_buffer_value("defbuffer1", i, readings=True)
-    reltime_val = mysmu.get_buffer_value("defbuffer1", i, relativetimestamps=True)
+for i, (reading_val, reltime_val) in enumerate(
+        zip(data["readings"], data["relativetimestamps"]), start=1):
     print(f"{i}\t{reltime_val}\t{reading_val}")
 
 mysmu.close()
@@ -25,7 +25,6 @@
 #       discharged at 0 V and the output is turned off
 #
 # ********************************************************************************
-import time
 import KeithleySeries2400InteractiveSmu as KeiSmu
 import KeithleySeries2400InteractiveSmu_Constants as smuconst
 
@@ -55,22 +54,17 @@ mysmu.source.output = smuconst.ON
 mysmu.trigger.model.initiate()
 
 # Wait until finished.
-time.sleep(0.1)
-trig_state = mysmu.trigger.model.state
-while trig_state is smuconst.TRIGGER_STATE_RUNNING:
-    time.sleep(0.1)
-    trig_state = mysmu.trigger.model.state
+mysmu.trigger.model.wait_for_idle()
 
 # Turn off the output.
 mysmu.source.output = smuconst.OFF
 
 # Read the resistance and time values from defbuffer1.
+data = mysmu.fetch("defbuffer1",
+                   columns=["readings", "relativetimestamps"])
 print("Reading #\tResistance\tTime")
-for i in range(1, mysmu.get_buffer_reading_count()+1, 1):
-    reading_val = mysmu.get_buffer_value("defbuffer1", i, readings=True)
-    reltime_val = mysmu.get_buffer_value("defbuffer1",
-                                         i,
-                                         relativetimestamps=True)
+for i, (reading_val, reltime_val) in enumerate(
+        zip(data["readings"], data["relativetimestamps"]), start=1):
     print(f"{i}\t{reltime_val}\t{reading_val}")
 
 # Optionally write the data from the buffer to a USB drive
@@ -265,6 +265,9 @@ def configure_test(do_beeps):
 
 
 smu.initialize("USB0::0x05E6::0x2460::04312353::INSTR")
+# Serve repeated reads of settings such as smu.measure.range and
+# localnode.model from the settings cache instead of re-querying them.
+smu.enable_settings_cache()
 val, ret_str = configure_system(True)
 val, ret_str = configure_test(True)
 print(f"{val}, {ret_str}")
@@ -12,9 +12,41 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import asyncio
+import collections
+import concurrent.futures
+import functools
+import re
+import socket
+import sys
+import time
+
 import pyvisa as visa
 import pyvisa.constants as pyconst
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Errors raised by the VISA and raw socket transports when a transfer fails
+_TRANSPORT_ERRORS = (visa.VisaIOError, OSError)
+
+# Matches the numbers in a command, which command templates replace with {}
+_COMMAND_ARGUMENT = re.compile(r"(?<![\w.])[-+]?(?:\d+\.?\d*|\.\d+)"
+                               r"(?:[eE][-+]?\d+)?")
+
+# Upper bounds, in seconds, of the latency histogram buckets
+_HISTOGRAM_BUCKETS = (0.0001, 0.001, 0.01, 0.1, 1.0)
+HISTOGRAM_LABELS = ("<100us", "<1ms", "<10ms", "<100ms", "<1s", ">=1s")
+
+CallRecord = collections.namedtuple(
+    "CallRecord", "template command caller sent received elapsed")
+
+# Matches raw socket resource strings such as TCPIP0::10.0.0.5::5025::SOCKET
+_SOCKET_RESOURCE = re.compile(r"^TCPIP\d*::([^:]+)::(\d+)::SOCKET$",
+                              re.IGNORECASE)
+
 
 class Communications:
     """
@@ -23,7 +55,20 @@ class Communications:
     def __init__(self):
         self.resource_manager = None
         self.instrument_object = None
+        self.settings_cache = None
+        self.statistics = None
+        # Counts the commands written, so callers can tell whether any
+        # setting may have changed since they last looked
+        self.write_count = 0
+        self._stale_responses = 0
+        self._batch = None
+        self._batch_depth = 0
+        self._batch_as_script = False
 
+    def initialize(self, instrument_resource_string, *args):
+        """
+        Temporary, provisional docstring
+        """
         try:
             if self.resource_manager is None:
                 self.resource_manager = visa.ResourceManager()
@@ -32,10 +77,6 @@ class Communications:
         except visa.VisaIOWarning as visawarning:
             print(f"{visawarning}")
 
-    def initialize(self, instrument_resource_string, *args):
-        """
-        Temporary, provisional docstring
-        """
         try:
             self.instrument_object = self.resource_manager.open_resource(
                 instrument_resource_string)
@@ -57,21 +98,634 @@ class Communications:
         """
         Temporary, provisional docstring
         """
+        self.write_count += 1
+        if self._batch is not None:
+            # Observed by the settings cache once the batch is sent
+            self._batch.append(command)
+            return
+        started = time.perf_counter()
         try:
-            self.instrument_object.write(command)
-        except visa.VisaIOError as visaerr:
+            self._send(command)
+        except _TRANSPORT_ERRORS as visaerr:
             print(f"{visaerr}")
+        if self.statistics is not None:
+            self.statistics.record(command, len(command) + 1, 0,
+                                   time.perf_counter() - started)
+        if self.settings_cache is not None:
+            self.settings_cache.observe(command)
         return
 
+    def begin_batch(self, as_script=False):
+        """
+        This function starts deferring writes. Commands written until the\
+            matching end_batch() are queued and sent to the instrument as one\
+            chunk; a query sends the commands queued ahead of it first.\
+            Batches may be nested, in which case the outermost batch sends.
+
+        :param as_script: (bool) Send the chunk as an anonymous script\
+            (loadandrunscript/endscript) rather than newline-joined commands
+        :return: None
+        """
+        if self._batch is None:
+            self._batch = []
+            self._batch_as_script = as_script
+        self._batch_depth += 1
+
+    def end_batch(self, discard=False):
+        """
+        This function ends a batch started with begin_batch(), sending the\
+            queued commands once the outermost batch ends.
+
+        :param discard: (bool) Drop the queued commands instead of sending\
+            them
+        :return: (bool) True if the outermost batch ended
+        """
+        self._batch_depth -= 1
+        if self._batch_depth > 0:
+            return False
+        if discard:
+            self._batch = None
+        else:
+            self._flush_batch()
+            self._batch = None
+        return True
+
+    def _flush_batch(self):
+        if not self._batch:
+            return
+        chunk = "\n".join(self._batch)
+        if self._batch_as_script:
+            chunk = f"loadandrunscript\n{chunk}\nendscript"
+        self._batch = []
+        started = time.perf_counter()
+        try:
+            self._send(chunk)
+        except _TRANSPORT_ERRORS as visaerr:
+            print(f"{visaerr}")
+        if self.statistics is not None:
+            self.statistics.record(chunk, len(chunk) + 1, 0,
+                                   time.perf_counter() - started)
+        if self.settings_cache is not None:
+            self.settings_cache.observe(chunk)
+
     def query(self, command):
         """
         Temporary, provisional docstring
         """
+        self._flush_batch()
         response = ""
+        started = time.perf_counter()
         try:
-            response = self.instrument_object.query(command).rstrip()
-        except visa.VisaIOError as visaerr:
+            self._discard_stale_responses()
+            self._send(command)
+            response = self._receive()
+        except _TRANSPORT_ERRORS as visaerr:
             print(f"{visaerr}")
+        if self.statistics is not None:
+            self.statistics.record(command, len(command) + 1,
+                                   len(response) + 1,
+                                   time.perf_counter() - started)
+        if self.settings_cache is not None:
+            self.settings_cache.observe(command)
 
         return response
 
+    def query_many(self, commands):
+        """
+        This function sends several queries in a single write and reads back\
+            their responses in order. Each command must print exactly one\
+            line, e.g. print(smu.measure.nplc).
+
+        :param commands: A sequence of query commands
+        :return: A tuple holding the response to each command
+        """
+        return self.query_lines("\n".join(commands), len(commands))
+
+    def query_lines(self, command, lines):
+        """
+        This function sends a command that prints several lines, e.g. two\
+            printbuffer() calls, and reads them all back.
+
+        :param command: (str) The command to send
+        :param lines: (int) The number of lines the command prints
+        :return: A tuple holding the lines in order; lines that were not\
+            received after a transport error are empty
+        """
+        self._flush_batch()
+        responses = []
+        started = time.perf_counter()
+        try:
+            self._discard_stale_responses()
+            self._send(command)
+            for _ in range(lines):
+                responses.append(self._receive())
+        except _TRANSPORT_ERRORS as visaerr:
+            print(f"{visaerr}")
+        if self.statistics is not None:
+            self.statistics.record(command, len(command) + 1,
+                                   sum(len(r) + 1 for r in responses),
+                                   time.perf_counter() - started)
+        responses.extend([""] * (lines - len(responses)))
+        if self.settings_cache is not None:
+            self.settings_cache.observe(command)
+
+        return tuple(responses)
+
+    def query_attribute(self, attribute):
+        """
+        This function reads the value of an instrument attribute with a single\
+            print() query, without assigning it to a global variable on the\
+            instrument first. When a settings cache is attached, cached values\
+            are returned without querying the instrument.
+
+        :param attribute: (str) The TSP attribute to read, such as\
+            smu.measure.nplc
+        :return: The printed value of the attribute as a string
+        """
+        if self.settings_cache is None:
+            return self.query(f"print({attribute})")
+
+        value = self.settings_cache.get(attribute)
+        if value is None:
+            value = self.query(f"print({attribute})")
+            # An empty response means the query failed; don't cache it
+            if value.strip():
+                self.settings_cache.store(attribute, value)
+        return value
+
+    def query_binary(self, command, datatype="d", data_points=0):
+        """
+        This function sends a command and reads back the IEEE binary block it\
+            produces as a numpy array, without creating a Python float for\
+            each value.
+
+        :param command: (str) The command that prints the binary data
+        :param datatype: (str) The struct format of one value; "d" for REAL64\
+            or "f" for REAL32
+        :param data_points: (int) The number of values expected; required for\
+            the indefinite length blocks printed by printbuffer()
+        :return: A (read-only) numpy array of the values received
+        """
+        if np is None:
+            raise ImportError("numpy is required for binary transfers")
+
+        self._flush_batch()
+        response = np.empty(0, dtype=datatype)
+        started = time.perf_counter()
+        try:
+            self._discard_stale_responses()
+            self._send(command)
+            response = self._receive_binary(datatype, data_points)
+        except _TRANSPORT_ERRORS as visaerr:
+            print(f"{visaerr}")
+        if self.statistics is not None:
+            # the #0 block header and the line terminator add three bytes
+            self.statistics.record(command, len(command) + 1,
+                                   response.nbytes + 3,
+                                   time.perf_counter() - started)
+
+        return response
+
+    def query_with_timeout(self, command, timeout):
+        """
+        This function sends a query and waits at most timeout seconds for\
+            its response, for queries the instrument only answers once an\
+            operation completes, such as *OPC?. A response that arrives after\
+            the timeout is discarded before the next query reads.
+
+        :param command: (str) The query command
+        :param timeout: (float) The time to wait in seconds; None waits\
+            indefinitely
+        :return: The response as a string, or None if the timeout expired
+        """
+        self._flush_batch()
+        response = ""
+        started = time.perf_counter()
+        try:
+            self._discard_stale_responses()
+            self._send(command)
+            previous_timeout = self._set_timeout(timeout)
+            try:
+                response = self._receive()
+            finally:
+                self._set_timeout(previous_timeout)
+        except _TRANSPORT_ERRORS as visaerr:
+            if _is_timeout(visaerr):
+                self._stale_responses += 1
+                response = None
+            else:
+                print(f"{visaerr}")
+        if self.statistics is not None:
+            self.statistics.record(command, len(command) + 1,
+                                   len(response or "") + 1,
+                                   time.perf_counter() - started)
+        if self.settings_cache is not None:
+            self.settings_cache.observe(command)
+
+        return response
+
+    def _discard_stale_responses(self):
+        # Reads and drops the responses of queries that timed out; the
+        # instrument answers in order, so they arrive ahead of anything new
+        while self._stale_responses:
+            self._receive()
+            self._stale_responses -= 1
+
+    def _send(self, command):
+        # Transport primitive: sends one command or newline-joined chunk
+        self.instrument_object.write(command)
+
+    def _receive(self):
+        # Transport primitive: reads one response line without its terminator
+        return self.instrument_object.read().rstrip()
+
+    def _receive_binary(self, datatype, data_points):
+        # Transport primitive: reads one little-endian IEEE binary block
+        return self.instrument_object.read_binary_values(
+            datatype=datatype, is_big_endian=False, container=np.ndarray,
+            data_points=data_points)
+
+    def _set_timeout(self, timeout):
+        # Transport primitive: sets the read timeout in seconds (None waits
+        # indefinitely) and returns the previous one
+        previous = self.instrument_object.timeout
+        self.instrument_object.timeout = None if timeout is None else \
+            timeout * 1000
+        return None if previous is None else previous / 1000
+
+
+class SocketCommunications(Communications):
+    """
+    Communications backend that talks to the instrument's raw TSP socket\
+        (port 5025) directly instead of going through VISA. Commands are\
+        framed with a newline, Nagle's algorithm is turned off so short\
+        commands go out at once, and responses are read through a local\
+        buffer so each line costs as few recv() calls as possible.
+    """
+    RECEIVE_SIZE = 65536
+
+    def __init__(self, timeout=10.0):
+        super().__init__()
+        self.timeout = timeout
+        self._socket = None
+        self._received = bytearray()
+
+    def initialize(self, instrument_resource_string, *args):
+        """
+        This function connects to the instrument's raw socket.
+
+        :param instrument_resource_string: (str) A raw socket resource\
+            string, TCPIP0::<host>::<port>::SOCKET
+        :return: None
+        """
+        address = parse_socket_resource(instrument_resource_string)
+        if address is None:
+            raise ValueError(f"{instrument_resource_string} is not a raw "
+                             f"socket resource")
+        try:
+            self._socket = socket.create_connection(address, self.timeout)
+            self._socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY,
+                                    1)
+        except OSError as sockerr:
+            print(f"{sockerr}")
+        self._received = bytearray()
+        return
+
+    def close(self):
+        """
+        This function closes the socket connection.
+        """
+        if self._socket is not None:
+            try:
+                self._socket.close()
+            except OSError as sockerr:
+                print(f"{sockerr}")
+            self._socket = None
+        return
+
+    def _send(self, command):
+        self._socket.sendall(command.encode() + b"\n")
+
+    def _receive(self):
+        end = self._received.find(b"\n")
+        while end < 0:
+            searched = len(self._received)
+            self._fill()
+            end = self._received.find(b"\n", searched)
+        line = bytes(self._received[:end])
+        del self._received[:end + 1]
+        return line.decode().rstrip()
+
+    def _receive_binary(self, datatype, data_points):
+        # IEEE 488.2 block: #<digits><length><data>, or #0<data> for the
+        # indefinite length blocks printed by printbuffer()
+        header = self._receive_exactly(2)
+        if header[:1] != b"#":
+            raise OSError(f"Malformed binary block header {header!r}")
+        digits = int(header[1:2])
+        itemsize = np.dtype(datatype).itemsize
+        if digits:
+            length = int(self._receive_exactly(digits))
+        else:
+            length = data_points * itemsize
+        block = self._receive_exactly(length)
+        self._receive()     # drops the line terminator after the block
+        return np.frombuffer(block, dtype=np.dtype(datatype).newbyteorder(
+            "<"))
+
+    def _set_timeout(self, timeout):
+        previous = self._socket.gettimeout()
+        self._socket.settimeout(timeout)
+        return previous
+
+    def _receive_exactly(self, size):
+        while len(self._received) < size:
+            self._fill()
+        data = bytes(self._received[:size])
+        del self._received[:size]
+        return data
+
+    def _fill(self):
+        data = self._socket.recv(self.RECEIVE_SIZE)
+        if not data:
+            raise ConnectionResetError("Instrument closed the connection")
+        self._received += data
+
+
+class CommandStatistics:
+    """
+    Records every transaction a Communications object makes with the\
+        instrument: the command and its template, the driver method that\
+        issued it, the bytes sent and received and the wall time taken.\
+        Attach one to Communications.statistics to start recording.
+    """
+    def __init__(self):
+        self.records = []
+
+    def record(self, command, sent, received, elapsed):
+        """
+        This function records one transaction.
+
+        :param command: (str) The command, or newline-joined chunk, sent
+        :param sent: (int) The number of bytes sent
+        :param received: (int) The number of bytes received
+        :param elapsed: (float) The wall time of the transaction in seconds
+        :return: None
+        """
+        self.records.append(CallRecord(command_template(command), command,
+                                       _calling_method(), sent, received,
+                                       elapsed))
+
+    def clear(self):
+        """
+        This function discards the recorded transactions.
+
+        :return: None
+        """
+        self.records = []
+
+    def by_method(self):
+        """
+        This function totals the recorded transactions for each calling\
+            driver method.
+
+        :return: A dictionary mapping each method to a dictionary of its\
+            calls, time, sent and received totals and its latency histogram,\
+            a list of counts for the buckets in HISTOGRAM_LABELS
+        """
+        methods = {}
+        for record in self.records:
+            totals = methods.setdefault(record.caller, {
+                "calls": 0, "time": 0.0, "sent": 0, "received": 0,
+                "histogram": [0] * (len(_HISTOGRAM_BUCKETS) + 1)})
+            totals["calls"] += 1
+            totals["time"] += record.elapsed
+            totals["sent"] += record.sent
+            totals["received"] += record.received
+            bucket = 0
+            while bucket < len(_HISTOGRAM_BUCKETS) and \
+                    record.elapsed >= _HISTOGRAM_BUCKETS[bucket]:
+                bucket += 1
+            totals["histogram"][bucket] += 1
+        return methods
+
+    def slowest(self, count=10):
+        """
+        This function returns the slowest recorded transactions.
+
+        :param count: (int) The number of transactions to return
+        :return: A list of CallRecord tuples, slowest first
+        """
+        return sorted(self.records, key=lambda record: record.elapsed,
+                      reverse=True)[:count]
+
+    def most_frequent(self, count=10):
+        """
+        This function returns the command templates sent most often, which\
+            points at loops issuing one query per item.
+
+        :param count: (int) The number of templates to return
+        :return: A list of (template, calls, total time) tuples
+        """
+        templates = {}
+        for record in self.records:
+            calls, elapsed = templates.get(record.template, (0, 0.0))
+            templates[record.template] = (calls + 1, elapsed + record.elapsed)
+        ranked = sorted(templates.items(), key=lambda item: item[1][0],
+                        reverse=True)[:count]
+        return [(template, calls, elapsed)
+                for template, (calls, elapsed) in ranked]
+
+    def summary(self, top=10):
+        """
+        This function formats the recorded transactions as a text report:\
+            per method totals with a latency histogram, the most frequent\
+            command templates and the slowest commands.
+
+        :param top: (int) The number of templates and slow commands listed
+        :return: (str) The report
+        """
+        lines = [f"{'Method':<48}{'Calls':>7}{'Total ms':>11}{'Sent':>9}"
+                 f"{'Recv':>9}  " + " ".join(f"{label:>7}" for label in
+                                              HISTOGRAM_LABELS)]
+        methods = sorted(self.by_method().items(),
+                         key=lambda item: item[1]["time"], reverse=True)
+        for method, totals in methods:
+            lines.append(f"{_fit(method, 48):<48}{totals['calls']:>7}"
+                         f"{totals['time'] * 1e3:>11.2f}{totals['sent']:>9}"
+                         f"{totals['received']:>9}  " +
+                         " ".join(f"{count:>7}"
+                                  for count in totals["histogram"]))
+
+        lines.append("")
+        lines.append(f"Most frequent commands (top {top})")
+        for template, calls, elapsed in self.most_frequent(top):
+            lines.append(f"{calls:>7}{elapsed * 1e3:>11.2f} ms  "
+                         f"{_one_line(template)}")
+
+        lines.append("")
+        lines.append(f"Slowest commands (top {top})")
+        for record in self.slowest(top):
+            lines.append(f"{record.elapsed * 1e3:>11.2f} ms  "
+                         f"{_fit(record.caller, 48):<48}"
+                         f"{_one_line(record.command)}")
+        return "\n".join(lines)
+
+
+def command_template(command):
+    """
+    This function reduces a command to its template by replacing its numeric\
+        arguments with {}, so that smu.measure.nplc=1 and\
+        smu.measure.nplc=0.1 are counted together.
+
+    :param command: (str) The command text
+    :return: (str) The command template
+    """
+    return _COMMAND_ARGUMENT.sub("{}", command)
+
+
+def _calling_method():
+    # Returns the qualified name of the first function on the stack outside
+    # this module, which is the driver method that issued the command
+    frame = sys._getframe(1)
+    while frame is not None and frame.f_globals.get("__name__") == __name__:
+        frame = frame.f_back
+    if frame is None:
+        return "<unknown>"
+    code = frame.f_code
+    return getattr(code, "co_qualname", code.co_name)
+
+
+def _one_line(command):
+    return _fit(" ".join(command.split()), 60)
+
+
+def _fit(text, width):
+    # Shortens text to fit a report column, keeping a space after it
+    if len(text) >= width:
+        return text[:width - 4] + "..."
+    return text
+
+
+def _is_timeout(error):
+    # True when a transport error reports an expired read timeout
+    return isinstance(error, TimeoutError) or \
+        getattr(error, "error_code", None) == pyconst.StatusCode.error_timeout
+
+
+def parse_socket_resource(instrument_resource_string):
+    """
+    This function splits a raw socket resource string into its host and port.
+
+    :param instrument_resource_string: (str) The resource string,\
+        TCPIP0::<host>::<port>::SOCKET
+    :return: A (host, port) tuple, or None when the string does not name a\
+        raw socket
+    """
+    match = _SOCKET_RESOURCE.match(instrument_resource_string.strip())
+    if match is None:
+        return None
+    return match.group(1), int(match.group(2))
+
+
+def communications_class(instrument_resource_string):
+    """
+    This function picks the transport for a resource string: raw socket\
+        resources use SocketCommunications and everything else goes through\
+        VISA.
+
+    :param instrument_resource_string: (str) The instrument resource string
+    :return: The Communications class to use
+    """
+    if parse_socket_resource(instrument_resource_string) is not None:
+        return SocketCommunications
+    return Communications
+
+
+class AsyncCommunications:
+    """
+    asyncio front end for a Communications object. Every blocking VISA
+    transaction runs on an executor dedicated to the instrument, so the event
+    loop stays free and transactions to one instrument never overlap.
+    """
+    def __init__(self, communications=None, executor=None):
+        if communications is None:
+            communications = Communications()
+        if executor is None:
+            executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="instrument")
+        self.communications = communications
+        self.executor = executor
+
+    async def run(self, function, *args, **kwargs):
+        """
+        This function runs a blocking call on the instrument's executor.
+
+        :param function: The callable to run
+        :return: The value returned by the callable
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor, functools.partial(function, *args, **kwargs))
+
+    async def initialize(self, instrument_resource_string, *args):
+        """
+        Temporary, provisional docstring
+        """
+        return await self.run(self.communications.initialize,
+                              instrument_resource_string, *args)
+
+    async def close(self):
+        """
+        This function closes the instrument connection and shuts down the\
+            instrument's executor.
+        """
+        try:
+            await self.run(self.communications.close)
+        finally:
+            self.executor.shutdown(wait=False)
+
+    async def write(self, command):
+        """
+        Temporary, provisional docstring
+        """
+        return await self.run(self.communications.write, command)
+
+    async def query(self, command):
+        """
+        Temporary, provisional docstring
+        """
+        return await self.run(self.communications.query, command)
+
+    async def query_with_timeout(self, command, timeout):
+        """
+        Awaitable version of Communications.query_with_timeout().
+        """
+        return await self.run(self.communications.query_with_timeout,
+                              command, timeout)
+
+    async def query_many(self, commands):
+        """
+        Awaitable version of Communications.query_many().
+        """
+        return await self.run(self.communications.query_many, commands)
+
+    async def query_lines(self, command, lines):
+        """
+        Awaitable version of Communications.query_lines().
+        """
+        return await self.run(self.communications.query_lines, command,
+                              lines)
+
+    async def query_attribute(self, attribute):
+        """
+        Awaitable version of Communications.query_attribute().
+        """
+        return await self.run(self.communications.query_attribute, attribute)
+
+    async def query_binary(self, command, datatype="d", data_points=0):
+        """
+        Awaitable version of Communications.query_binary().
+        """
+        return await self.run(self.communications.query_binary, command,
+                              datatype, data_points)
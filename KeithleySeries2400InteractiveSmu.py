@@ -12,9 +12,17 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import math
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 import CommunicationsInterface as comms
 import KeithleySeries2400InteractiveSmu_BufferConfiguration as buffer_config
+import KeithleySeries2400InteractiveSmu_BufferData as buffer_data
 import KeithleySeries2400InteractiveSmu_Constants as smuconst
 import KeithleySeries2400InteractiveSmu_DataQueueConfiguration as \
     dataqueue_config
@@ -27,6 +35,10 @@ import KeithleySeries2400InteractiveSmu_EventLogConfiguration as \
 import KeithleySeries2400InteractiveSmu_LocalNodeConfiguration as \
     localnode_config
 import KeithleySeries2400InteractiveSmu_TspLinkConfiguration as tsplink_config
+import KeithleySeries2400InteractiveSmu_SettingsCache as settings_cache
+import KeithleySeries2400InteractiveSmu_SettingsSnapshot as \
+    settings_snapshot
+import KeithleySeries2400InteractiveSmu_Simulator as simulator
 
 
 class KeithleySeries2400InteractiveSmu:
@@ -41,6 +53,13 @@ class KeithleySeries2400InteractiveSmu:
         # self.instrument_object = None
         self.instrumentcomms = comms.Communications()
         self.buffer = buffer_config.Buffer()
+        self.buffer_pool = buffer_config.BufferPool(self.buffer)
+        # The settings last read or applied as a whole, for apply_profile(),
+        # and the write count of the connection at that point
+        self._known_settings = None
+        self._known_write_count = 0
+        # The settings soft_reset() returns to
+        self.baseline = None
         self.dataqueue = dataqueue_config.DataQueueConfiguration()
         self.display = display_config.DisplayConfiguration()
         self.eventlog = eventlog_config.EventLogConfiguration()
@@ -57,10 +76,68 @@ class KeithleySeries2400InteractiveSmu:
         def __init__(self):
             self.resourcerm = None
 
+    class Batch(object):
+        """
+        Context manager that defers the driver's writes and sends them to the\
+            instrument as one chunk when the block exits. Errors the\
+            instrument logged while running the chunk are collected once, at\
+            the end, in the errors attribute.
+        """
+        def __init__(self, smu, as_script=False, check_errors=True):
+            self._smu = smu
+            self._as_script = as_script
+            self._check_errors = check_errors
+            self.errors = []
+
+        def __enter__(self):
+            self._smu.instrumentcomms.begin_batch(self._as_script)
+            return self
+
+        def __exit__(self, exc_type, exc_value, traceback):
+            sent = self._smu.instrumentcomms.end_batch(
+                discard=exc_type is not None)
+            if sent and exc_type is None and self._check_errors:
+                error_count = self._smu.eventlog.getcount(
+                    smuconst.EVENTLOG_SEV_ERROR)
+                for _ in range(error_count):
+                    error = self._smu.eventlog.next(
+                        smuconst.EVENTLOG_SEV_ERROR)
+                    self.errors.append(error)
+                    print(f"{error}")
+            return False
+
+    def batch(self, as_script=False, check_errors=True):
+        """
+        This function returns a context manager that queues every command\
+            written inside the with block and sends them as one newline-joined\
+            chunk, or as one anonymous script, when the block exits.
+
+        :param as_script: (bool) Send the queued commands as an anonymous\
+            script instead of a newline-joined chunk
+        :param check_errors: (bool) Read the errors logged by the instrument\
+            after the chunk is sent
+        :return: A Batch context manager; its errors attribute lists the\
+            error events read after the chunk was sent
+        """
+        return self.Batch(self, as_script, check_errors)
+
     def initialize(self, instrument_resource_string, *args):
         """
         Placeholder docstring descriptions.
         """
+        # Raw socket resource strings (TCPIP0::<host>::5025::SOCKET) bypass
+        # VISA and SIM::<model>::INSTR runs the in-process simulator; the
+        # settings cache and statistics carry over to the new transport
+        if simulator.is_simulator_resource(instrument_resource_string):
+            transport = simulator.SimulatedCommunications
+        else:
+            transport = comms.communications_class(instrument_resource_string)
+        if type(self.instrumentcomms) is not transport:
+            previous = self.instrumentcomms
+            self.instrumentcomms = transport()
+            self.instrumentcomms.settings_cache = previous.settings_cache
+            self.instrumentcomms.statistics = previous.statistics
+        self._known_settings = None
         try:
             self.instrumentcomms.initialize(instrument_resource_string, *args)
             self.buffer.mycomms = self.instrumentcomms
@@ -80,6 +157,203 @@ class KeithleySeries2400InteractiveSmu:
         except:
             print("error")
 
+    def enable_settings_cache(self, enable=True):
+        """
+        This function turns the write-through settings cache on or off. While\
+            it is on, attribute getters are answered from values previously\
+            read or written instead of querying the instrument; reset() and\
+            configuration list recalls invalidate it.
+
+        :param enable: (bool) True to attach a new, empty cache; False to\
+            remove the cache
+        :return: None
+        """
+        if enable:
+            self.instrumentcomms.settings_cache = \
+                settings_cache.SettingsCache()
+        else:
+            self.instrumentcomms.settings_cache = None
+
+    @property
+    def settings_cache(self):
+        """
+        This attribute holds the active settings cache, including its hits\
+            and misses counters, or None when caching is disabled.
+
+        :return: The SettingsCache in use or None
+        """
+        return self.instrumentcomms.settings_cache
+
+    def enable_statistics(self, enable=True):
+        """
+        This function turns per-command instrumentation on or off. While it\
+            is on, every transaction records its command template, bytes\
+            sent and received, wall time and the driver method that issued\
+            it; print(smu.statistics.summary()) reports where the time went.
+
+        :param enable: (bool) True to attach a new, empty recorder; False to\
+            remove it
+        :return: None
+        """
+        if enable:
+            self.instrumentcomms.statistics = comms.CommandStatistics()
+        else:
+            self.instrumentcomms.statistics = None
+
+    @property
+    def statistics(self):
+        """
+        This attribute holds the active CommandStatistics recorder, or None\
+            when instrumentation is disabled.
+
+        :return: The CommandStatistics in use or None
+        """
+        return self.instrumentcomms.statistics
+
+    def settings_snapshot(self):
+        """
+        This function captures the source, measure, filter, rel, math and\
+            limit settings of the selected functions, plus the terminals and\
+            output state, in a single query. With the settings cache on, the\
+            captured values also fill the cache.
+
+        :return: A SettingsSnapshot, an immutable record whose fields are\
+            listed in SNAPSHOT_ATTRIBUTES
+        """
+        response = self.instrumentcomms.query(
+            settings_snapshot.SNAPSHOT_COMMAND)
+        snapshot = settings_snapshot.parse_snapshot(response)
+        self._remember_settings(snapshot)
+        if self.settings_cache is not None:
+            for attribute, value in zip(
+                    settings_snapshot.SNAPSHOT_ATTRIBUTES,
+                    response.rstrip("\r\n").split("\t")):
+                if value != "nil":
+                    self.settings_cache.store(attribute, value)
+        return snapshot
+
+    def restore(self, snapshot):
+        """
+        This function returns the instrument to the settings captured by\
+            settings_snapshot(), sending every assignment in one batched\
+            write.
+
+        :param snapshot: A SettingsSnapshot
+        :return: The error events the instrument logged while applying the\
+            settings
+        """
+        with self.batch() as restore_batch:
+            for command in settings_snapshot.restore_commands(snapshot):
+                self.instrumentcomms.write(command)
+        self._remember_settings(None if restore_batch.errors else snapshot)
+        return restore_batch.errors
+
+    def apply_profile(self, profile, refresh=False):
+        """
+        This function configures the instrument from a profile, sending only\
+            the settings that differ from the last known state in one\
+            batched chunk, ordered so that function and range changes stay\
+            valid. The known state comes from the last settings_snapshot(),\
+            restore() or apply_profile(), and is read again when any other\
+            command has been written since.
+
+        :param profile: The path of a JSON or TOML profile file, or a\
+            dictionary in the same form (see load_profile())
+        :param refresh: (bool) Read the instrument settings before comparing,\
+            e.g. after changes made from the front panel or a query
+        :return: The error events the instrument logged while applying the\
+            changes
+        """
+        if isinstance(profile, dict):
+            profile = settings_snapshot.normalize_profile(profile)
+        else:
+            profile = settings_snapshot.load_profile(profile)
+        known_settings = self._tracked_settings()
+        if refresh or known_settings is None:
+            known_settings = self.settings_snapshot()
+
+        commands, target = settings_snapshot.profile_changes(
+            known_settings, profile)
+        return self._apply_changes(commands, target)
+
+    def set_baseline(self, snapshot=None):
+        """
+        This function records the settings soft_reset() returns to.
+
+        :param snapshot: A SettingsSnapshot; by default the present\
+            instrument settings are captured
+        :return: The baseline SettingsSnapshot
+        """
+        if snapshot is None:
+            snapshot = self.settings_snapshot()
+        self.baseline = snapshot
+        return snapshot
+
+    def soft_reset(self, clear_buffers=True, refresh=False):
+        """
+        This function returns the instrument to the baseline settings\
+            without a full reset() and reconfiguration. The output is always\
+            switched off first, then only the settings that differ from the\
+            baseline are sent, in one batched chunk. Without a baseline a\
+            full reset() is made and its settings become the baseline.
+
+        :param clear_buffers: (bool) Clear defbuffer1 and defbuffer2 in the\
+            same chunk
+        :param refresh: (bool) Read the instrument settings before comparing,\
+            e.g. after changes made from the front panel or a query; they\
+            are read anyway when other commands were written since the last\
+            snapshot, restore() or apply_profile()
+        :return: The error events the instrument logged while applying the\
+            changes
+        """
+        if self.baseline is None:
+            self.reset()
+            self.set_baseline()
+            return []
+        known_settings = self._tracked_settings()
+        if refresh or known_settings is None:
+            known_settings = self.settings_snapshot()
+
+        baseline = {name: value for name, value in
+                    self.baseline._asdict().items() if value is not None}
+        baseline["source_output"] = "smu.OFF"
+        commands, target = settings_snapshot.profile_changes(
+            known_settings, baseline)
+        # Whatever the known state says, nothing is sourced while the other
+        # settings change
+        output_off = "smu.source.output = smu.OFF"
+        commands = [output_off] + [command for command in commands
+                                   if command != output_off]
+        if clear_buffers:
+            commands += ["defbuffer1.clear()", "defbuffer2.clear()"]
+        return self._apply_changes(commands, target)
+
+    def _apply_changes(self, commands, target):
+        # Sends settings changes as one batch and records the state they
+        # leave the instrument in
+        if not commands:
+            return []
+        with self.batch() as changes_batch:
+            for command in commands:
+                self.instrumentcomms.write(command)
+        # After an error the instrument state is uncertain; read it again
+        # next time
+        self._remember_settings(None if changes_batch.errors else target)
+        return changes_batch.errors
+
+    def _remember_settings(self, snapshot):
+        # Records the settings known to hold once the writes made so far
+        # have been applied
+        self._known_settings = snapshot
+        self._known_write_count = self.instrumentcomms.write_count
+
+    def _tracked_settings(self):
+        # Returns the known settings, or None when commands have been
+        # written since they were recorded and may have changed them
+        if self.instrumentcomms.write_count != self._known_write_count:
+            return None
+        return self._known_settings
+
     def reset(self):
         """
         This function resets commands to their default settings and clears the\
@@ -87,6 +361,10 @@ class KeithleySeries2400InteractiveSmu:
         :return: None
         """
         self.instrumentcomms.write("reset()")
+        # reset() deletes the user-defined buffers
+        self.buffer.styles.clear()
+        self.buffer_pool.forget()
+        self._known_settings = None
 
     def instrument_id_query(self):
         """
@@ -109,7 +387,8 @@ class KeithleySeries2400InteractiveSmu:
         :param functionality:
         :return:
         """
-        self.instrumentcomms.write(f"presence = available({functionality})")
+        return self.instrumentcomms.query(
+            f"print(available({functionality}))")
 
     def beep(self, duration, frequency):
         """
@@ -139,8 +418,7 @@ class KeithleySeries2400InteractiveSmu:
         :return: Either 0 (TERMINALS_FRONT) or 1 (TERMINALS_REAR)
         """
         term = None
-        self.instrumentcomms.write("terminals = smu.terminals")
-        if "FRONT" in self.instrumentcomms.query("print(terminals)").rstrip():
+        if "FRONT" in self.instrumentcomms.query_attribute("smu.terminals"):
             term = smuconst.TERMINALS_FRONT
         else:
             term = smuconst.TERMINALS_REAR
@@ -169,6 +447,66 @@ class KeithleySeries2400InteractiveSmu:
         """
         self.instrumentcomms.write("waitcomplete()")
 
+    def plan_buffer(self, buffer_name="defbuffer1", count=None,
+                    duration=None, delay=0.0, margin=0.1, style=None,
+                    apply=True):
+        """
+        This function sizes a reading buffer for a SimpleLoop (count) or\
+            DurationLoop (duration) trigger model before it is initiated.\
+            A DurationLoop makes at most one reading per delay plus\
+            aperture (smu.measure.nplc / localnode.linefreq), which bounds\
+            the reading count. A warning is printed when the buffer cannot\
+            hold the plan, since readings beyond its capacity are silently\
+            lost or overwritten.
+
+        :param buffer_name: The name of the reading buffer, which may be a\
+            default buffer (defbuffer1 or defbuffer2) or a user-defined\
+            buffer; user buffers not yet made are made with the planned\
+            capacity
+        :param count: (int) The count passed to load_simple_loop()
+        :param duration: (float) The duration passed to load_duration_loop()
+        :param delay: (float) The delay before each measurement
+        :param margin: (float) The fraction of spare capacity to add
+        :param style: One of the BUFFER_STYLE_* constants, used when the\
+            buffer is made; defaults to the buffer's current style
+        :param apply: (bool) Set or make the buffer capacity; False only\
+            checks the present capacity
+        :return: A BufferPlan
+        """
+        if (count is None) == (duration is None):
+            raise ValueError("Give either a count or a duration")
+        if count is not None:
+            readings = int(count)
+        else:
+            nplc, linefreq = self.instrumentcomms.query_many(
+                ("print(smu.measure.nplc)", "print(localnode.linefreq)"))
+            period = float(delay or 0.0) + float(nplc) / float(linefreq)
+            readings = math.ceil(duration / period)
+        capacity = math.ceil(round(readings * (1.0 + margin), 6))
+
+        default_buffer = buffer_name in ("defbuffer1", "defbuffer2")
+        if style is None or default_buffer or \
+           buffer_name in self.buffer.styles:
+            style = self.buffer.style(buffer_name)
+        nbytes = capacity * buffer_config.STYLE_READING_BYTES[style]
+
+        if apply:
+            if default_buffer or buffer_name in self.buffer.styles:
+                self.buffer.capacity(buffer_name, capacity)
+            else:
+                self.buffer.make(buffer_name, capacity, style)
+        # Read back from the instrument itself; the settings cache would
+        # answer with the capacity just written, even if it was refused
+        buffer_capacity = int(float(self.instrumentcomms.query(
+            f"print({buffer_name}.capacity)")))
+
+        fits = buffer_capacity >= readings
+        if not fits:
+            print(f"Warning: {buffer_name} holds {buffer_capacity} readings "
+                  f"but the trigger model is expected to make {readings}")
+        return buffer_config.BufferPlan(readings, capacity, nbytes,
+                                        buffer_capacity, fits)
+
     def get_buffer_reading_count(self, buffer_name="defbuffer1"):
         """
         This function returns the number of readings presently stored in the \
@@ -258,3 +596,344 @@ class KeithleySeries2400InteractiveSmu:
             write_string += f"{buffer_name}.units[{index}]"
         write_string += ")"
         return self.instrumentcomms.query(write_string).rstrip()
+
+    def fetch(self, buffer_name="defbuffer1", start=1, end=None,
+              columns=("readings",),
+              chunk_size=buffer_config.FETCH_CHUNK_SIZE):
+        """
+        This function reads a range of readings from a reading buffer in bulk\
+            using printbuffer(), returning every requested column at once.
+
+        :param buffer_name: The name of the reading buffer, which may be a\
+            default buffer (defbuffer1 or defbuffer2) or a user-defined buffer
+        :param start: (int) The first index to read
+        :param end: (int) The last index to read; defaults to the number of\
+            readings presently stored in the buffer
+        :param columns: The buffer columns to read (readings,\
+            relativetimestamps, seconds, statuses, units, etc.)
+        :param chunk_size: (int) The maximum number of readings requested\
+            from the instrument per printbuffer() call
+        :return: A dictionary mapping each requested column name to a list of\
+            values; text columns hold strings, all others hold floats
+        """
+        for column in columns:
+            if column not in buffer_config.BUFFER_COLUMNS:
+                raise ValueError(f"Unknown buffer column: {column}")
+        self.buffer.check_columns(buffer_name, columns)
+
+        if end is None:
+            end = self.get_buffer_reading_count(buffer_name)
+
+        data = {column: [] for column in columns}
+        if end < start:
+            return data
+
+        column_str = ", ".join(f"{buffer_name}.{column}"
+                               for column in columns)
+
+        for chunk_start in range(start, end + 1, chunk_size):
+            chunk_end = min(chunk_start + chunk_size - 1, end)
+            response = self.instrumentcomms.query(
+                f"printbuffer({chunk_start}, {chunk_end}, {column_str})")
+            buffer_config.append_printbuffer(data, response, columns)
+
+        return data
+
+    def stream(self, buffer_name="defbuffer1", columns=("readings",),
+               interval=0.1, skip_existing=False,
+               chunk_size=buffer_config.FETCH_CHUNK_SIZE):
+        """
+        This function returns a generator that drains a reading buffer while\
+            the trigger model fills it. Each poll is one transaction: it\
+            fetches the readings reported new by the previous poll and reads\
+            the buffer's n, endindex and the trigger model state for the\
+            next one. The generator yields each batch of new readings and\
+            stops once the trigger model is no longer running and the buffer\
+            is drained, so the caller can analyse data during acquisition.
+
+            In CONTINUOUS fill mode the indexes wrap around at the buffer\
+            capacity; the wrapped range is read in two printbuffer() calls so\
+            no reading is lost or repeated, provided the buffer holds at\
+            least the readings made during one poll interval. Each poll\
+            checks that the slot of the last reading read still holds it\
+            and raises RuntimeError if the buffer wrapped past unread\
+            readings.
+
+        :param buffer_name: The name of the reading buffer, which may be a\
+            default buffer (defbuffer1 or defbuffer2) or a user-defined buffer
+        :param columns: The buffer columns to read (readings,\
+            relativetimestamps, timestamps, statuses, etc.)
+        :param interval: (float) The minimum time between polls in seconds;\
+            time the caller spends on a batch counts towards it
+        :param skip_existing: (bool) Only stream readings made after the\
+            first poll instead of everything in the buffer
+        :param chunk_size: (int) The maximum number of readings requested\
+            per printbuffer() call
+        :return: A generator yielding dictionaries that map each column\
+            name to a list of new values, as fetch() returns them
+        """
+        for column in columns:
+            if column not in buffer_config.BUFFER_COLUMNS:
+                raise ValueError(f"Unknown buffer column: {column}")
+        self.buffer.check_columns(buffer_name, columns)
+
+        status_command = f"print({buffer_name}.n, {buffer_name}.endindex, " \
+                         f"{buffer_name}.capacity, trigger.model.state())"
+
+        def parse_status(response):
+            fields = response.split("\t")
+            if len(fields) < 4:
+                raise RuntimeError(f"No buffer status received for "
+                                   f"{buffer_name}: {response!r}")
+            running = any(state in fields[3] for state in
+                          ("RUNNING", "WAITING", "ABORTING"))
+            return (int(float(fields[0])), int(float(fields[1])),
+                    int(float(fields[2])), running)
+
+        def marker_command(index):
+            return f"print({buffer_name}.relativetimestamps[{index}])"
+
+        count, end, capacity, running = parse_status(
+            self.instrumentcomms.query(status_command))
+        # pending readings end at the physical index end
+        pending = 0 if skip_existing else count
+        # The relative timestamp of the last reading read and its index;
+        # when the reading in that slot changes, the buffer has wrapped past
+        # readings that were never read
+        marker, marker_index = None, None
+        if skip_existing and count:
+            marker_index = end
+            marker = self.instrumentcomms.query(
+                marker_command(marker_index)).strip()
+        while True:
+            polled = time.perf_counter()
+            commands = [command for _, command in
+                        buffer_config.printbuffer_commands(
+                            buffer_name, columns, end, pending, capacity,
+                            chunk_size)]
+            data_count = len(commands)
+            if marker is not None:
+                commands.append(marker_command(marker_index))
+            if pending:
+                commands.append(marker_command(end))
+            if running:
+                commands.append(status_command)
+            if not data_count and not running:
+                return
+
+            responses = self.instrumentcomms.query_many(commands)
+            position = data_count
+            if marker is not None:
+                if responses[position].strip() != marker:
+                    raise RuntimeError(
+                        f"{buffer_name} wrapped past readings that were not "
+                        f"read yet; poll more often or increase its capacity")
+                position += 1
+            if pending:
+                marker, marker_index = responses[position].strip(), end
+
+            data = {column: [] for column in columns}
+            for response in responses[:data_count]:
+                buffer_config.append_printbuffer(data, response, columns)
+            if pending:
+                yield data
+            if not running:
+                return
+
+            previous_count, previous_end = count, end
+            count, end, capacity, running = parse_status(responses[-1])
+            if count < previous_count:
+                # the buffer was cleared; everything in it is new
+                pending = count
+                marker, marker_index = None, None
+            else:
+                pending = (end - previous_end) % capacity
+
+            if running:
+                remaining = interval - (time.perf_counter() - polled)
+                if remaining > 0:
+                    time.sleep(remaining)
+
+    def mirror(self, buffer_name="defbuffer1",
+               columns=buffer_config.MIRROR_COLUMNS):
+        """
+        This function creates a host-side mirror of a reading buffer and\
+            performs its first sync. Call sync() on the mirror to pick up new\
+            readings; reads of mirrored indexes never query the instrument.
+
+        :param buffer_name: The name of the reading buffer, which may be a\
+            default buffer (defbuffer1 or defbuffer2) or a user-defined buffer
+        :param columns: The buffer columns to mirror
+        :return: A BufferMirror
+        """
+        self.buffer.check_columns(buffer_name, columns)
+        buffer_mirror = buffer_config.BufferMirror(buffer_name, columns,
+                                                   self.instrumentcomms)
+        buffer_mirror.sync()
+        return buffer_mirror
+
+    def snapshot(self, buffer_name="defbuffer1", start=1, end=None,
+                 columns=None):
+        """
+        This function reads a range of a buffer into a compact BufferSnapshot\
+            that holds each column as one block of doubles. With numpy the\
+            readings travel as binary REAL64 straight into the snapshot's\
+            memory; otherwise they are read as text into array('d').
+
+        :param buffer_name: The name of the reading buffer, which may be a\
+            default buffer (defbuffer1 or defbuffer2) or a user-defined buffer
+        :param start: (int) The first index to read
+        :param end: (int) The last index to read; defaults to the number of\
+            readings presently stored in the buffer
+        :param columns: The columns to read, from readings, sourcevalues,\
+            relativetimestamps, seconds, fractionalseconds, statuses and\
+            sourcestatuses; defaults to all of them the buffer's style stores
+        :return: A BufferSnapshot; columns not read are None
+        """
+        if columns is None:
+            columns = self.buffer.columns(buffer_name,
+                                          buffer_data.SNAPSHOT_COLUMNS)
+        for column in columns:
+            if column not in buffer_data.SNAPSHOT_COLUMNS:
+                raise ValueError(f"Not a snapshot column: {column}")
+        if end is None:
+            end = self.get_buffer_reading_count(buffer_name)
+
+        if np is None:
+            data = self.fetch(buffer_name, start, end, columns)
+            return buffer_data.BufferSnapshot(**data)
+
+        # Column-major storage keeps every column contiguous
+        out = np.empty((max(end - start + 1, 0), len(columns)), order="F")
+        data = self.fetch_array(buffer_name, start, end, columns, out=out)
+        return buffer_data.BufferSnapshot(**data)
+
+    def fetch_timestamps(self, buffer_name="defbuffer1", start=1, end=None,
+                         as_datetime64=True):
+        """
+        This function reads the absolute timestamps of a range of readings.\
+            Rather than formatting a date and time string per reading, the\
+            raw seconds and fractionalseconds columns are transferred and\
+            combined in one vectorized step.
+
+        :param buffer_name: The name of the reading buffer, which may be a\
+            default buffer (defbuffer1 or defbuffer2) or a user-defined buffer
+        :param start: (int) The first index to read
+        :param end: (int) The last index to read; defaults to the number of\
+            readings presently stored in the buffer
+        :param as_datetime64: (bool) Return numpy datetime64[ns] values;\
+            False returns float64 seconds since the epoch
+        :return: An array of UTC timestamps, one per reading
+        """
+        if np is None:
+            data = self.fetch(buffer_name, start, end,
+                              ("seconds", "fractionalseconds"))
+        else:
+            data = self.fetch_array(buffer_name, start, end,
+                                    ("seconds", "fractionalseconds"))
+        return buffer_data.combine_timestamps(data["seconds"],
+                                              data["fractionalseconds"],
+                                              as_datetime64)
+
+    def fetch_statuses(self, buffer_name="defbuffer1", start=1, end=None,
+                       columns=None):
+        """
+        This function reads the status words of a range of readings in bulk\
+            as integers, ready for the decoders in the buffer data module,\
+            e.g. buffer_data.source_limited(statuses["sourcestatuses"]).
+
+        :param buffer_name: The name of the reading buffer, which may be a\
+            default buffer (defbuffer1 or defbuffer2) or a user-defined buffer
+        :param start: (int) The first index to read
+        :param end: (int) The last index to read; defaults to the number of\
+            readings presently stored in the buffer
+        :param columns: The columns to read, statuses and/or sourcestatuses;\
+            defaults to those the buffer's style stores
+        :return: A dictionary mapping each column name to an int64 numpy\
+            array, or to a list of ints when numpy is not installed
+        """
+        if columns is None:
+            columns = self.buffer.columns(buffer_name,
+                                          ("statuses", "sourcestatuses"))
+        for column in columns:
+            if column not in ("statuses", "sourcestatuses"):
+                raise ValueError(f"Not a status column: {column}")
+        if np is None:
+            data = self.fetch(buffer_name, start, end, columns)
+        else:
+            data = self.fetch_array(buffer_name, start, end, columns)
+        return {column: buffer_data.status_words(values)
+                for column, values in data.items()}
+
+    def fetch_array(self, buffer_name="defbuffer1", start=1, end=None,
+                    columns=("readings",),
+                    data_format=smuconst.DATA_FORMAT_REAL64, out=None,
+                    chunk_size=buffer_config.FETCH_CHUNK_SIZE):
+        """
+        This function reads a range of numeric buffer columns using a binary\
+            (REAL64 or REAL32) printbuffer() transfer, placing the samples\
+            directly into a preallocated numpy array.
+
+        :param buffer_name: The name of the reading buffer, which may be a\
+            default buffer (defbuffer1 or defbuffer2) or a user-defined buffer
+        :param start: (int) The first index to read
+        :param end: (int) The last index to read; defaults to the number of\
+            readings presently stored in the buffer
+        :param columns: The numeric buffer columns to read (readings,\
+            relativetimestamps, seconds, fractionalseconds, statuses, etc.)
+        :param data_format: Either DATA_FORMAT_REAL64 or DATA_FORMAT_REAL32
+        :param out: (numpy.ndarray) Optional array of shape (readings,\
+            columns) to fill; allocated when not supplied
+        :param chunk_size: (int) The maximum number of readings requested\
+            from the instrument per printbuffer() call
+        :return: A dictionary mapping each requested column name to a numpy\
+            array view of that column in the output array
+        """
+        if np is None:
+            raise ImportError("numpy is required for fetch_array")
+        for column in columns:
+            if column not in buffer_config.BUFFER_COLUMNS or \
+               column in buffer_config.STRING_COLUMNS:
+                raise ValueError(f"Not a numeric buffer column: {column}")
+        self.buffer.check_columns(buffer_name, columns)
+
+        if data_format == smuconst.DATA_FORMAT_REAL32:
+            format_str = "format.REAL32"
+            datatype = "f"
+        else:
+            format_str = "format.REAL64"
+            datatype = "d"
+
+        if end is None:
+            end = self.get_buffer_reading_count(buffer_name)
+        count = max(end - start + 1, 0)
+        column_count = len(columns)
+
+        if out is None:
+            out = np.empty((count, column_count), dtype=datatype)
+        elif out.shape != (count, column_count):
+            raise ValueError(f"out must have shape ({count}, {column_count})")
+
+        column_str = ", ".join(f"{buffer_name}.{column}"
+                               for column in columns)
+
+        self.instrumentcomms.write(f"format.data = {format_str} "
+                                   "format.byteorder = format.LITTLEENDIAN")
+        try:
+            for chunk_start in range(start, end + 1, chunk_size):
+                chunk_end = min(chunk_start + chunk_size - 1, end)
+                row = chunk_start - start
+                rows = chunk_end - chunk_start + 1
+                values = self.instrumentcomms.query_binary(
+                    f"printbuffer({chunk_start}, {chunk_end}, {column_str})",
+                    datatype=datatype, data_points=rows * column_count)
+                if values.size != rows * column_count:
+                    raise RuntimeError(
+                        f"Expected {rows * column_count} values for indexes "
+                        f"{chunk_start} to {chunk_end} of {buffer_name}, "
+                        f"received {values.size}")
+                out[row:row + rows] = values.reshape(rows, column_count)
+        finally:
+            self.instrumentcomms.write("format.data = format.ASCII")
+
+        return {column: out[:, i] for i, column in enumerate(columns)}
@@ -0,0 +1,197 @@
+#  Copyright 2022 Joshua Brown
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import CommunicationsInterface as _comms
+import KeithleySeries2400InteractiveSmu as _smu
+import KeithleySeries2400InteractiveSmu_BufferConfiguration as _buffer_config
+
+# Returned by next() once a generator is exhausted
+_EXHAUSTED = object()
+
+
+class _AsyncProxy:
+    """
+    Wraps one of the driver's configuration objects so that every method call
+    and property read becomes awaitable and runs on the instrument's executor.
+    """
+    def __init__(self, target, asynccomms):
+        self._target = target
+        self._asynccomms = asynccomms
+
+    def __getattr__(self, name):
+        class_attribute = getattr(type(self._target), name, None)
+        if isinstance(class_attribute, property):
+            return self._asynccomms.run(class_attribute.fget, self._target)
+
+        value = getattr(self._target, name)
+        wrapped = _wrap(value, self._asynccomms)
+        if wrapped is not value:
+            return wrapped
+        if callable(value) and not isinstance(value, type):
+            async def call(*args, **kwargs):
+                return _wrap(await self._asynccomms.run(value, *args,
+                                                        **kwargs),
+                             self._asynccomms)
+            return call
+        return value
+
+    async def set(self, name, value):
+        """
+        This function assigns a property, such as nplc, on the instrument's
+        executor.
+
+        :param name: (str) The name of the property to assign
+        :param value: The value to assign
+        :return: None
+        """
+        await self._asynccomms.run(setattr, self._target, name, value)
+
+
+class _AsyncMirror(_AsyncProxy):
+    """
+    Wraps a BufferMirror; sync() and value() are awaited, while reading a\
+        mirrored column by index answers locally.
+    """
+    def __getitem__(self, column):
+        return self._target[column]
+
+    def __len__(self):
+        return len(self._target)
+
+
+class _AsyncLease:
+    """
+    Wraps a BufferLease so that the buffer is released on the instrument's\
+        executor, in an async with block or by awaiting release().
+    """
+    def __init__(self, lease, asynccomms):
+        self._lease = lease
+        self._asynccomms = asynccomms
+        self.name = lease.name
+
+    async def release(self):
+        """
+        This function returns the buffer to its pool.
+
+        :return: None
+        """
+        await self._asynccomms.run(self._lease.release)
+
+    async def __aenter__(self):
+        return self.name
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.release()
+        return False
+
+
+def _wrap(value, asynccomms):
+    # Wraps the driver objects that do I/O so that it runs on the executor
+    if isinstance(value, _buffer_config.BufferMirror):
+        return _AsyncMirror(value, asynccomms)
+    if isinstance(value, _buffer_config.BufferLease):
+        return _AsyncLease(value, asynccomms)
+    if isinstance(value, _buffer_config.BufferPool) or \
+       hasattr(value, "_mycomms") or hasattr(value, "mycomms"):
+        return _AsyncProxy(value, asynccomms)
+    return value
+
+
+class AsyncKeithleySeries2400InteractiveSmu(_AsyncProxy):
+    """
+    asyncio facade for KeithleySeries2400InteractiveSmu. Methods and
+    properties of the driver and its configuration objects are awaited
+    (await smu.measure.read(), await smu.measure.nplc,
+    await smu.measure.set("nplc", 1.0)), with all blocking I/O running on a
+    single executor owned by this instrument. Buffer pools, their leases
+    (async with await smu.buffer_pool.lease(100) as name) and buffer
+    mirrors are wrapped the same way, and stream() is an async generator.
+    """
+    def __init__(self, executor=None):
+        smu = _smu.KeithleySeries2400InteractiveSmu()
+        super().__init__(smu, _comms.AsyncCommunications(smu.instrumentcomms,
+                                                         executor))
+
+    @property
+    def instrumentcomms(self):
+        """
+        This attribute is the AsyncCommunications transport of the
+        instrument, for sending raw commands.
+        """
+        return self._asynccomms
+
+    async def initialize(self, instrument_resource_string, *args):
+        """
+        Placeholder docstring descriptions.
+        """
+        await self._asynccomms.run(self._target.initialize,
+                                   instrument_resource_string, *args)
+        self._asynccomms.communications = self._target.instrumentcomms
+
+    async def close(self):
+        """
+        This function closes the instrument and shuts down its executor.
+        """
+        await self._asynccomms.close()
+
+    async def stream(self, *args, **kwargs):
+        """
+        This function drains a reading buffer while the trigger model fills\
+            it, as KeithleySeries2400InteractiveSmu.stream() does, polling\
+            on the instrument's executor; use it in an async for statement.
+
+        :return: An async generator yielding dictionaries that map each\
+            column name to a list of new values
+        """
+        generator = self._target.stream(*args, **kwargs)
+        try:
+            while True:
+                data = await self._asynccomms.run(next, generator,
+                                                  _EXHAUSTED)
+                if data is _EXHAUSTED:
+                    return
+                yield data
+        finally:
+            await self._asynccomms.run(generator.close)
+
+    def batch(self, as_script=False, check_errors=True):
+        """
+        This function returns an async context manager that queues the writes
+        awaited inside the async with block and sends them as one chunk when
+        the block exits.
+
+        :param as_script: (bool) Send the queued commands as an anonymous
+            script instead of a newline-joined chunk
+        :param check_errors: (bool) Read the errors logged by the instrument
+            after the chunk is sent
+        :return: An async context manager yielding the driver's Batch
+        """
+        return _AsyncBatch(self._target.batch(as_script, check_errors),
+                           self._asynccomms)
+
+
+class _AsyncBatch:
+    """
+    Runs the enter and exit of a driver Batch on the instrument's executor.
+    """
+    def __init__(self, batch, asynccomms):
+        self._batch = batch
+        self._asynccomms = asynccomms
+
+    async def __aenter__(self):
+        return await self._asynccomms.run(self._batch.__enter__)
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        return await self._asynccomms.run(self._batch.__exit__, exc_type,
+                                          exc_value, traceback)
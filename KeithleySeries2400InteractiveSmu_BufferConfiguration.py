@@ -13,8 +13,77 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import collections
+
 import KeithleySeries2400InteractiveSmu_Constants as _smuconst
 
+# Reading buffer columns that can be passed to printbuffer(). Columns listed
+# in STRING_COLUMNS are returned as text; all others are parsed as numbers.
+BUFFER_COLUMNS = ("readings", "relativetimestamps", "formattedreadings",
+                  "fractionalseconds", "extravalues", "extravalueunits",
+                  "extraformattedvalues", "dates", "seconds",
+                  "sourceformattedvalues", "sourcestatuses", "sourceunits",
+                  "sourcevalues", "statuses", "times", "timestamps", "units")
+STRING_COLUMNS = ("formattedreadings", "extravalueunits",
+                  "extraformattedvalues", "dates", "sourceformattedvalues",
+                  "sourceunits", "times", "timestamps", "units")
+
+# TSP names of the buffer styles
+BUFFER_STYLES = {_smuconst.BUFFER_STYLE_COMPACT: "buffer.STYLE_COMPACT",
+                 _smuconst.BUFFER_STYLE_STANDARD: "buffer.STYLE_STANDARD",
+                 _smuconst.BUFFER_STYLE_FULL: "buffer.STYLE_FULL",
+                 _smuconst.BUFFER_STYLE_WRITABLE: "buffer.STYLE_WRITABLE",
+                 _smuconst.BUFFER_STYLE_WRITABLE_FULL:
+                     "buffer.STYLE_WRITABLE_FULL"}
+
+# The columns each buffer style stores. Compact and writable buffers hold no
+# source values and only the full styles hold extra values; reading a column
+# a buffer does not store is an error on the instrument.
+_SOURCE_COLUMNS = ("sourceformattedvalues", "sourcestatuses", "sourceunits",
+                   "sourcevalues")
+_EXTRA_COLUMNS = ("extravalues", "extravalueunits", "extraformattedvalues")
+STYLE_COLUMNS = {
+    _smuconst.BUFFER_STYLE_COMPACT: tuple(
+        column for column in BUFFER_COLUMNS
+        if column not in _SOURCE_COLUMNS + _EXTRA_COLUMNS),
+    _smuconst.BUFFER_STYLE_STANDARD: tuple(
+        column for column in BUFFER_COLUMNS if column not in _EXTRA_COLUMNS),
+    _smuconst.BUFFER_STYLE_FULL: BUFFER_COLUMNS,
+    _smuconst.BUFFER_STYLE_WRITABLE: tuple(
+        column for column in BUFFER_COLUMNS
+        if column not in _SOURCE_COLUMNS + _EXTRA_COLUMNS),
+    _smuconst.BUFFER_STYLE_WRITABLE_FULL: tuple(
+        column for column in BUFFER_COLUMNS if column not in _SOURCE_COLUMNS)}
+
+# Rough instrument memory used per reading by each buffer style, for the
+# estimates of plan_buffer() only
+STYLE_READING_BYTES = {_smuconst.BUFFER_STYLE_COMPACT: 16,
+                       _smuconst.BUFFER_STYLE_STANDARD: 48,
+                       _smuconst.BUFFER_STYLE_FULL: 80,
+                       _smuconst.BUFFER_STYLE_WRITABLE: 32,
+                       _smuconst.BUFFER_STYLE_WRITABLE_FULL: 64}
+
+# The result of plan_buffer(): the estimated number of readings a trigger
+# model makes, the capacity chosen for them, the estimated memory, the
+# capacity the buffer reports afterwards and whether the readings fit.
+BufferPlan = collections.namedtuple(
+    "BufferPlan", ("readings", "capacity", "nbytes", "buffer_capacity",
+                   "fits"))
+
+# The number of readings requested from the instrument per printbuffer() call
+# when bulk reading a buffer.
+FETCH_CHUNK_SIZE = 5000
+
+# The columns a BufferMirror keeps when none are given
+MIRROR_COLUMNS = ("readings", "relativetimestamps", "statuses")
+
+# Summary statistics of a reading buffer, as returned by getstats(). The min
+# and max times are seconds since the epoch; fields the instrument reports
+# as nil, such as those of an empty buffer, are None.
+BufferStatistics = collections.namedtuple(
+    "BufferStatistics",
+    ("n", "mean", "stddev", "min", "min_time", "max", "max_time"))
+
 
 class Buffer:
     """
@@ -22,6 +91,9 @@ class Buffer:
     """
     def __init__(self):
         self.mycomms = None
+        # The style of each buffer made through make(); the default buffers
+        # are standard
+        self.styles = {}
 
     def update_comms(self):
         """
@@ -46,8 +118,7 @@ class Buffer:
         :return:
         """
         if buffer_capacity is None:
-            self.mycomms.write(f"cap = {buffername}.capacity")
-            cap = int(self.mycomms.query("print(cap)").rstrip())
+            cap = int(self.mycomms.query_attribute(f"{buffername}.capacity"))
             return cap
         else:
             self.mycomms.write(f"{buffername}.capacity={buffer_capacity}")
@@ -85,6 +156,49 @@ class Buffer:
     def delete(self, buffername):
         """This function deletes a user-defined reading buffer."""
         self.mycomms.write(f"buffer.delete({buffername})")
+        self.styles.pop(buffername, None)
+
+    def style(self, buffername):
+        """
+        This function returns the style a buffer was made with.
+
+        :param buffername: (str) The name of the reading buffer
+        :return: One of the BUFFER_STYLE_* constants; buffers not made\
+            through make(), such as defbuffer1, report BUFFER_STYLE_STANDARD
+        """
+        return self.styles.get(buffername, _smuconst.BUFFER_STYLE_STANDARD)
+
+    def columns(self, buffername, columns=BUFFER_COLUMNS):
+        """
+        This function filters a list of buffer columns down to those the\
+            style of a buffer stores.
+
+        :param buffername: (str) The name of the reading buffer
+        :param columns: The buffer columns wanted
+        :return: A tuple of the columns the buffer provides, in the order\
+            given
+        """
+        stored = STYLE_COLUMNS[self.style(buffername)]
+        return tuple(column for column in columns if column in stored)
+
+    def check_columns(self, buffername, columns):
+        """
+        This function checks that a buffer stores every column requested,\
+            before a printbuffer() the instrument would reject is sent.
+
+        :param buffername: (str) The name of the reading buffer
+        :param columns: The buffer columns requested
+        :return: None
+        """
+        if not columns:
+            raise ValueError(f"No columns requested from {buffername}")
+        style = self.style(buffername)
+        missing = [column for column in columns
+                   if column not in STYLE_COLUMNS[style]]
+        if missing:
+            style = BUFFER_STYLES[style]
+            raise ValueError(f"{buffername} is a {style} buffer and does "
+                             f"not store {', '.join(missing)}")
 
     @property
     def endindex(self, buffername):
@@ -132,27 +246,48 @@ class Buffer:
         """
         self.mycomms.write(f"{buffername}.fillmode = {mode}")
 
-    def getstats(self, *args):
+    def getstats(self, buffername="defbuffer1"):
         """
-        This function returns statistics from a specified reading buffer.
+        This function returns statistics from a specified reading buffer,\
+            read in a single round trip without transferring the readings.
+
+        :param buffername: (str) The name of the reading buffer, or a list\
+            of names to read the statistics of several buffers in one\
+            transfer
+        :return: A BufferStatistics, or a dictionary mapping each buffer\
+            name to its BufferStatistics when a list was given; raises\
+            RuntimeError when no statistics were received
         """
-        return
+        if isinstance(buffername, str):
+            return _parse_stats(self.mycomms.query(_stats_command(buffername)))
+        buffernames = list(buffername)
+        responses = self.mycomms.query_many(
+            [_stats_command(name) for name in buffernames])
+        return {name: _parse_stats(response)
+                for name, response in zip(buffernames, responses)}
 
     def make(self, buffername, buffersize, style=None):
         """
         This function creates a user-defined reading buffer.
-        """
-        stylestr = ""
-        if style is not None:
-            if style == 0:
-                stylestr = ""
-            elif style == 1:
-                stylestr = ""
 
-            self.mycomms.write(f"{buffername} = buffer.make({buffersize},\
-                {stylestr})")
-        else:
+        :param buffername: (str) The name of the new buffer
+        :param buffersize: (int) The number of readings the buffer can store;\
+            set to 0 to maximize the buffer size
+        :param style: One of BUFFER_STYLE_COMPACT, BUFFER_STYLE_STANDARD,\
+            BUFFER_STYLE_FULL, BUFFER_STYLE_WRITABLE or\
+            BUFFER_STYLE_WRITABLE_FULL; the instrument default is standard.\
+            Compact buffers hold far more readings but no source values.
+        :return: None
+        """
+        if style is None:
             self.mycomms.write(f"{buffername} = buffer.make({buffersize})")
+            style = _smuconst.BUFFER_STYLE_STANDARD
+        elif style in BUFFER_STYLES:
+            self.mycomms.write(f"{buffername} = buffer.make({buffersize}, "
+                               f"{BUFFER_STYLES[style]})")
+        else:
+            raise ValueError(f"Unknown buffer style: {style}")
+        self.styles[buffername] = style
 
     def math(self, buffername, unit, expression, *constants):
         """
@@ -263,3 +398,331 @@ class Buffer:
         param: second = (None)
         """
         print(0)
+
+
+class BufferPool:
+    """
+    Reusable user-defined reading buffers. lease() hands out a buffer of the\
+        requested capacity and style, making one only when no idle buffer\
+        matches; returned buffers are cleared rather than deleted, so\
+        per-part scripts do not reallocate instrument memory. A buffer is\
+        leased to one holder at a time.
+    """
+    def __init__(self, buffer, prefix="poolbuffer"):
+        self.buffer = buffer
+        self.prefix = prefix
+        self._made = 0
+        self._specs = {}
+        self._idle = []
+        self._leased = set()
+        # Buffers leased when forget() was called; releasing them is a no-op
+        self._forgotten = set()
+        self._closed = False
+
+    def lease(self, capacity, style=_smuconst.BUFFER_STYLE_STANDARD):
+        """
+        This function leases a cleared user-defined buffer.
+
+        :param capacity: (int) The number of readings the buffer must store
+        :param style: One of the BUFFER_STYLE_* constants
+        :return: A BufferLease; use it in a with statement, which yields the\
+            buffer name and releases it on exit, or call its release()
+        """
+        self._closed = False
+        spec = (capacity, style)
+        for buffername in self._idle:
+            if self._specs[buffername] == spec:
+                self._idle.remove(buffername)
+                break
+        else:
+            self._made += 1
+            buffername = f"{self.prefix}{self._made}"
+            self.buffer.make(buffername, capacity, style)
+            self._specs[buffername] = spec
+        self._leased.add(buffername)
+        return BufferLease(self, buffername)
+
+    def release(self, buffername):
+        """
+        This function returns a leased buffer to the pool, clearing its\
+            readings and statistics. Once the pool is closed the buffer is\
+            deleted instead. Buffers dropped by forget() are ignored, since\
+            the instrument has already deleted them.
+
+        :param buffername: (str) The name of the leased buffer
+        :return: None
+        """
+        if buffername in self._forgotten:
+            self._forgotten.remove(buffername)
+            return
+        if buffername not in self._leased:
+            raise ValueError(f"{buffername} is not leased from this pool")
+        self._leased.remove(buffername)
+        if self._closed:
+            self.buffer.delete(buffername)
+            del self._specs[buffername]
+            return
+        self.buffer.clear(buffername)
+        self._idle.append(buffername)
+
+    @property
+    def leased(self):
+        """
+        This attribute lists the names of the buffers currently leased.
+        """
+        return tuple(sorted(self._leased))
+
+    def close(self):
+        """
+        This function deletes the idle buffers of the pool from the\
+            instrument. Leased buffers are deleted when they are released;\
+            a later lease() reopens the pool.
+
+        :return: None
+        """
+        for buffername in self._idle:
+            self.buffer.delete(buffername)
+            del self._specs[buffername]
+        self._idle = []
+        self._closed = True
+
+    def forget(self):
+        """
+        This function drops every buffer from the pool without deleting it,\
+            for when the instrument has already deleted them, e.g. after a\
+            reset().
+
+        :return: None
+        """
+        self._specs.clear()
+        self._idle = []
+        self._forgotten.update(self._leased)
+        self._leased.clear()
+
+
+class BufferLease:
+    """
+    A buffer leased from a BufferPool. Used as a context manager it yields\
+        the buffer name and returns the buffer to the pool on exit.
+    """
+    def __init__(self, pool, name):
+        self.pool = pool
+        self.name = name
+
+    def release(self):
+        """
+        This function returns the buffer to its pool.
+
+        :return: None
+        """
+        self.pool.release(self.name)
+
+    def __enter__(self):
+        return self.name
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+        return False
+
+
+class BufferMirror:
+    """
+    Host-side columnar copy of a reading buffer. sync() transfers only the\
+        readings added since the previous sync, and reads of mirrored\
+        indexes are answered locally without touching the instrument.\
+        Indexes follow the instrument's, so in CONTINUOUS fill mode they\
+        wrap at the buffer capacity just as startindex and endindex do.
+    """
+    def __init__(self, buffername="defbuffer1", columns=MIRROR_COLUMNS,
+                 mycomms=None, chunk_size=FETCH_CHUNK_SIZE):
+        for column in columns:
+            if column not in BUFFER_COLUMNS:
+                raise ValueError(f"Unknown buffer column: {column}")
+        self.buffername = buffername
+        self.columns = tuple(columns)
+        self.mycomms = mycomms
+        self.chunk_size = chunk_size
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        This function discards the mirrored readings so that the next sync()\
+            transfers the whole buffer again, e.g. after the buffer was\
+            cleared and refilled.
+
+        :return: None
+        """
+        self._slots = {column: [] for column in self.columns}
+        self.count = 0
+        self.capacity = None
+        self.startindex = 0
+        self.endindex = 0
+        # The relative timestamp of the last mirrored reading
+        self._marker = None
+
+    def sync(self):
+        """
+        This function brings the mirror up to date with the instrument,\
+            transferring only the readings added since the previous sync.\
+            When a CONTINUOUS buffer wrapped past the last mirrored reading,\
+            i.e. took capacity or more readings since the previous sync, the\
+            whole buffer is transferred again.
+
+        :return: (int) The number of new readings transferred
+        """
+        status_command = f"print({self.buffername}.n, " \
+                         f"{self.buffername}.endindex, " \
+                         f"{self.buffername}.capacity"
+        if self._marker is not None:
+            status_command += f", {self._marker_command(self.endindex)}"
+        status = self.mycomms.query(f"{status_command})").split("\t")
+        if len(status) < (3 if self._marker is None else 4):
+            raise RuntimeError(f"No buffer status received for "
+                               f"{self.buffername}: {status!r}")
+        count, end, capacity = (int(float(value)) for value in status[:3])
+        if capacity != self.capacity or count < self.count or \
+           (self._marker is not None and status[3].strip() != self._marker):
+            self.invalidate()
+            self.capacity = capacity
+        new = min(max((end - self.endindex) % capacity if capacity else 0,
+                      count - self.count), capacity)
+
+        if new:
+            commands = printbuffer_commands(self.buffername, self.columns,
+                                            end, new, capacity,
+                                            self.chunk_size)
+            responses = self.mycomms.query_many(
+                [command for _, command in commands] +
+                [f"print({self._marker_command(end)})"])
+            self._marker = responses[-1].strip()
+            for (slot, _), response in zip(commands, responses):
+                data = {column: [] for column in self.columns}
+                append_printbuffer(data, response, self.columns)
+                for column, values in data.items():
+                    stored = self._slots[column]
+                    if len(stored) < slot - 1:
+                        stored.extend([None] * (slot - 1 - len(stored)))
+                    stored[slot - 1:slot - 1 + len(values)] = values
+
+        self.count = count
+        self.endindex = end
+        self.startindex = 0 if not count else (end - count) % capacity + 1
+        return new
+
+    def _marker_command(self, index):
+        return f"{self.buffername}.relativetimestamps[{index}]"
+
+    def value(self, column, index):
+        """
+        This function returns one mirrored value, syncing first if the index\
+            has not been mirrored yet.
+
+        :param column: (str) A mirrored buffer column, such as readings
+        :param index: (int) The 1-based buffer index
+        :return: The value, as a float for numeric columns
+        """
+        if column not in self._slots:
+            raise KeyError(f"{column} is not mirrored")
+        if not 1 <= index <= self.count:
+            self.sync()
+            if not 1 <= index <= self.count:
+                raise IndexError(f"Index {index} is outside "
+                                 f"{self.buffername}")
+        return self._slots[column][index - 1]
+
+    def __getitem__(self, column):
+        """
+        This function returns a mirrored column in acquisition order, oldest\
+            reading first, without syncing.
+
+        :param column: (str) A mirrored buffer column
+        :return: A list of values
+        """
+        if column not in self._slots:
+            raise KeyError(f"{column} is not mirrored")
+        stored = self._slots[column]
+        if self.count < (self.capacity or 0):
+            return stored[:self.count]
+        return stored[self.endindex:] + stored[:self.endindex]
+
+    def __len__(self):
+        return self.count
+
+
+def printbuffer_commands(buffername, columns, end, count, capacity,
+                         chunk_size=FETCH_CHUNK_SIZE):
+    """
+    This function builds the printbuffer() commands that read the count\
+        readings ending at index end. A range that wraps past the buffer\
+        capacity is split in two, and each call requests at most chunk_size\
+        readings.
+
+    :param buffername: (str) The name of the reading buffer
+    :param columns: The buffer columns to read
+    :param end: (int) The index of the last reading to read
+    :param count: (int) The number of readings to read
+    :param capacity: (int) The buffer capacity
+    :param chunk_size: (int) The maximum readings per printbuffer() call
+    :return: A list of (first index, command) tuples
+    """
+    column_str = ", ".join(f"{buffername}.{column}" for column in columns)
+    first = (end - count) % capacity + 1 if capacity else 1
+    commands = []
+    for range_start, range_end in ((first, min(first + count - 1, capacity)),
+                                   (1, first + count - 1 - capacity)):
+        for chunk_start in range(range_start, range_end + 1, chunk_size):
+            chunk_end = min(chunk_start + chunk_size - 1, range_end)
+            commands.append((chunk_start, f"printbuffer({chunk_start}, "
+                                          f"{chunk_end}, {column_str})"))
+    return commands
+
+
+def append_printbuffer(data, response, columns):
+    """
+    This function de-interleaves one printbuffer() response into lists of\
+        column values.
+
+    :param data: A dictionary mapping each column name to the list to extend
+    :param response: (str) The comma-separated printbuffer() output
+    :param columns: The buffer columns printed, in order
+    :return: None
+    """
+    values = [value.strip() for value in response.split(",")]
+    column_count = len(columns)
+    for i, column in enumerate(columns):
+        column_values = values[i::column_count]
+        if column in STRING_COLUMNS:
+            data[column].extend(column_values)
+        else:
+            data[column].extend(map(float, column_values))
+
+
+def _stats_command(buffername):
+    # Prints the getstats() table of a buffer on one line; min and max are
+    # nil for an empty buffer, so their fields are guarded
+    fields = ", ".join(f"stats.{extreme} and stats.{extreme}.{field}"
+                       for extreme in ("min", "max")
+                       for field in ("reading", "seconds",
+                                     "fractionalseconds"))
+    return (f"local stats = buffer.getstats({buffername}) "
+            f"print(stats.n, stats.mean, stats.stddev, {fields})")
+
+
+def _parse_stats(response):
+    # An empty buffer prints nil fields; anything else without the nine
+    # fields, such as the empty response after a transport error, is not
+    # a table of statistics
+    fields = response.split()
+    if len(fields) != 9:
+        raise RuntimeError(f"Unexpected buffer statistics: {response!r}")
+    try:
+        values = [None if field == "nil" else float(field)
+                  for field in fields]
+    except ValueError:
+        raise RuntimeError(f"Unexpected buffer statistics: {response!r}")
+    (n, mean, stddev, minimum, min_seconds, min_fraction, maximum,
+     max_seconds, max_fraction) = values
+    return BufferStatistics(
+        int(n or 0), mean, stddev,
+        minimum, None if min_seconds is None else min_seconds + min_fraction,
+        maximum, None if max_seconds is None else max_seconds + max_fraction)
@@ -0,0 +1,338 @@
+#  Copyright 2022 Joshua Brown
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import array
+import collections
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# The numeric buffer columns a BufferSnapshot holds, in storage order
+SNAPSHOT_COLUMNS = ("readings", "sourcevalues", "relativetimestamps",
+                    "seconds", "fractionalseconds", "statuses",
+                    "sourcestatuses")
+
+Reading = collections.namedtuple("Reading", SNAPSHOT_COLUMNS)
+
+# The value the instrument stores for a reading that is out of range
+OVERFLOW_READING = 9.9e37
+
+# Bits of the statuses buffer column (buffer.STAT_*)
+STAT_QUESTIONABLE = 0x01
+STAT_ORIGIN = 0x06
+STAT_TERMINAL = 0x08
+STAT_LIMIT2_LOW = 0x10
+STAT_LIMIT2_HIGH = 0x20
+STAT_LIMIT1_LOW = 0x40
+STAT_LIMIT1_HIGH = 0x80
+STAT_START_GROUP = 0x100
+
+# Bits of the sourcestatuses buffer column
+SOURCE_STAT_SENSE = 0x01
+SOURCE_STAT_LIMIT = 0x02
+SOURCE_STAT_OVP = 0x04
+SOURCE_STAT_OUTPUT = 0x08
+
+
+class BufferSnapshot:
+    """
+    Compact, columnar copy of buffer readings. Each column is held as one\
+        block of 8-byte floats, a numpy array when numpy is installed and a\
+        memoryview over array('d') otherwise, rather than as Python objects\
+        per reading. Slicing returns a snapshot sharing the same memory, and\
+        export() hands a column to other code as a memoryview without\
+        copying. Columns that were not read are None.
+    """
+    __slots__ = SNAPSHOT_COLUMNS + ("_length",)
+
+    def __init__(self, **columns):
+        self._length = None
+        for name in SNAPSHOT_COLUMNS:
+            values = columns.pop(name, None)
+            if values is not None:
+                values = _as_column(values)
+                if self._length is None:
+                    self._length = len(values)
+                elif len(values) != self._length:
+                    raise ValueError(f"Column {name} holds {len(values)} "
+                                     f"values, expected {self._length}")
+            setattr(self, name, values)
+        if columns:
+            raise ValueError(f"Not a snapshot column: {', '.join(columns)}")
+        if self._length is None:
+            self._length = 0
+
+    @classmethod
+    def concatenate(cls, snapshots):
+        """
+        This function joins snapshots end to end, e.g. to build one log from\
+            the batches of a long run. Only columns present in every\
+            snapshot are kept.
+
+        :param snapshots: A sequence of BufferSnapshot objects
+        :return: A new BufferSnapshot holding copies of the readings
+        """
+        snapshots = list(snapshots)
+        columns = {}
+        for name in SNAPSHOT_COLUMNS:
+            parts = [getattr(snapshot, name) for snapshot in snapshots]
+            if not parts or any(part is None for part in parts):
+                continue
+            if np is not None:
+                columns[name] = np.concatenate(parts)
+            else:
+                joined = array.array("d")
+                for part in parts:
+                    joined.frombytes(part.tobytes())
+                columns[name] = joined
+        return cls(**columns)
+
+    @property
+    def columns(self):
+        """
+        This attribute lists the names of the columns the snapshot holds.
+        """
+        return tuple(name for name in SNAPSHOT_COLUMNS
+                     if getattr(self, name) is not None)
+
+    @property
+    def nbytes(self):
+        """
+        This attribute is the memory used by the column data in bytes.
+        """
+        return sum(getattr(self, name).nbytes for name in self.columns)
+
+    def export(self, column):
+        """
+        This function exports a column through the buffer protocol without\
+            copying it.
+
+        :param column: (str) The column name, such as readings
+        :return: A read-only memoryview of 8-byte floats
+        """
+        values = getattr(self, column, None) if column in SNAPSHOT_COLUMNS \
+            else None
+        if values is None:
+            raise KeyError(f"{column} is not held by this snapshot")
+        return memoryview(values).toreadonly()
+
+    def timestamps(self, as_datetime64=True):
+        """
+        This function combines the seconds and fractionalseconds columns\
+            into absolute timestamps in one vectorized step.
+
+        :param as_datetime64: (bool) Return numpy datetime64[ns] values;\
+            False returns float64 seconds since the epoch
+        :return: The timestamps, as combine_timestamps() returns them
+        """
+        if self.seconds is None or self.fractionalseconds is None:
+            raise KeyError("timestamps need the seconds and "
+                           "fractionalseconds columns")
+        return combine_timestamps(self.seconds, self.fractionalseconds,
+                                  as_datetime64)
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            # numpy and memoryview slices are views, so nothing is copied
+            view = object.__new__(BufferSnapshot)
+            view._length = len(range(*index.indices(self._length)))
+            for name in SNAPSHOT_COLUMNS:
+                values = getattr(self, name)
+                setattr(view, name, None if values is None else values[index])
+            return view
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("BufferSnapshot index out of range")
+        return Reading(*(None if getattr(self, name) is None else
+                         float(getattr(self, name)[index])
+                         for name in SNAPSHOT_COLUMNS))
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self[index]
+
+    def __repr__(self):
+        return f"BufferSnapshot({self._length} readings, " \
+               f"columns={', '.join(self.columns)})"
+
+
+def _as_column(values):
+    # Stores values as a contiguous block of doubles, without copying when
+    # they already are one
+    if np is not None:
+        return np.ascontiguousarray(values, dtype=np.float64)
+    if isinstance(values, memoryview) and values.format == "d":
+        return values
+    if not isinstance(values, array.array) or values.typecode != "d":
+        values = array.array("d", values)
+    return memoryview(values)
+
+
+def combine_timestamps(seconds, fractionalseconds, as_datetime64=True):
+    """
+    This function combines the whole and fractional seconds of buffer\
+        readings into absolute UTC timestamps without formatting or parsing\
+        a string per reading.
+
+    :param seconds: The seconds buffer column
+    :param fractionalseconds: The fractionalseconds buffer column
+    :param as_datetime64: (bool) Return a numpy datetime64[ns] array;\
+        False returns float64 seconds since the epoch
+    :return: A numpy array, or an array('d') of epoch seconds when numpy is\
+        not installed
+    """
+    if np is None:
+        if as_datetime64:
+            raise ImportError("numpy is required for datetime64 timestamps")
+        return array.array("d", map(float.__add__, map(float, seconds),
+                                    map(float, fractionalseconds)))
+
+    seconds = np.asarray(seconds, dtype=np.float64)
+    fractionalseconds = np.asarray(fractionalseconds, dtype=np.float64)
+    if not as_datetime64:
+        return seconds + fractionalseconds
+    nanoseconds = seconds.astype(np.int64) * 1000000000 + \
+        np.rint(fractionalseconds * 1e9).astype(np.int64)
+    return nanoseconds.view("datetime64[ns]")
+
+
+def status_words(values):
+    """
+    This function converts a statuses or sourcestatuses column, as read by\
+        fetch(), fetch_array() or a snapshot, into integer status words.
+
+    :param values: The column values
+    :return: A numpy int64 array, or a list of ints when numpy is not\
+        installed
+    """
+    if np is not None:
+        return np.asarray(values).astype(np.int64)
+    return [int(value) for value in values]
+
+
+def status_mask(statuses, bits):
+    """
+    This function tests every status word against a bit mask at once.
+
+    :param statuses: A statuses or sourcestatuses column
+    :param bits: (int) The STAT_* bits to test, combined with |
+    :return: A boolean mask that is True where any of the bits are set; a\
+        numpy array, or a list when numpy is not installed
+    """
+    words = status_words(statuses)
+    if np is not None:
+        return (words & bits) != 0
+    return [(word & bits) != 0 for word in words]
+
+
+def limit_failures(statuses, limit=1, high=True, low=True):
+    """
+    This function marks the readings that failed a limit test.
+
+    :param statuses: The statuses column
+    :param limit: (int) The limit test, 1 or 2
+    :param high: (bool) Include readings above the high limit
+    :param low: (bool) Include readings below the low limit
+    :return: A boolean mask of the failed readings
+    """
+    if limit == 1:
+        high_bit, low_bit = STAT_LIMIT1_HIGH, STAT_LIMIT1_LOW
+    elif limit == 2:
+        high_bit, low_bit = STAT_LIMIT2_HIGH, STAT_LIMIT2_LOW
+    else:
+        raise ValueError(f"limit must be 1 or 2, not {limit}")
+    return status_mask(statuses, (high_bit if high else 0) |
+                       (low_bit if low else 0))
+
+
+def source_limited(sourcestatuses):
+    """
+    This function marks the readings taken while the source was in\
+        compliance, i.e. its limit was tripped.
+
+    :param sourcestatuses: The sourcestatuses column
+    :return: A boolean mask of the readings in compliance
+    """
+    return status_mask(sourcestatuses, SOURCE_STAT_LIMIT)
+
+
+def remote_sense(sourcestatuses):
+    """
+    This function marks the readings taken with remote (4-wire) sense.
+
+    :param sourcestatuses: The sourcestatuses column
+    :return: A boolean mask of the remote sense readings
+    """
+    return status_mask(sourcestatuses, SOURCE_STAT_SENSE)
+
+
+def overvoltage_protection(sourcestatuses):
+    """
+    This function marks the readings taken while overvoltage protection\
+        was active.
+
+    :param sourcestatuses: The sourcestatuses column
+    :return: A boolean mask of the readings under overvoltage protection
+    """
+    return status_mask(sourcestatuses, SOURCE_STAT_OVP)
+
+
+def output_on(sourcestatuses):
+    """
+    This function marks the readings taken while the source output was on.
+
+    :param sourcestatuses: The sourcestatuses column
+    :return: A boolean mask of the readings with the output on
+    """
+    return status_mask(sourcestatuses, SOURCE_STAT_OUTPUT)
+
+
+def questionable(statuses):
+    """
+    This function marks the readings the instrument flagged as questionable.
+
+    :param statuses: The statuses column
+    :return: A boolean mask of the questionable readings
+    """
+    return status_mask(statuses, STAT_QUESTIONABLE)
+
+
+def front_terminals(statuses):
+    """
+    This function marks the readings measured on the front terminals; the\
+        others were measured on the rear terminals.
+
+    :param statuses: The statuses column
+    :return: A boolean mask of the front terminal readings
+    """
+    return status_mask(statuses, STAT_TERMINAL)
+
+
+def overrange(readings):
+    """
+    This function marks the readings the instrument stored as overflow.
+
+    :param readings: The readings column
+    :return: A boolean mask of the overrange readings
+    """
+    if np is not None:
+        return np.abs(np.asarray(readings, dtype=np.float64)) >= \
+            OVERFLOW_READING
+    return [abs(float(reading)) >= OVERFLOW_READING for reading in readings]
@@ -96,6 +96,18 @@ BUFFER_SAVE_RELATIVE_TIME = 1
 BUFFER_SAVE_RAW_TIME = 2
 BUFFER_SAVE_TIMESTAMP_TIME = 3
 
+# Buffer style constants
+BUFFER_STYLE_COMPACT = 0
+BUFFER_STYLE_STANDARD = 1
+BUFFER_STYLE_FULL = 2
+BUFFER_STYLE_WRITABLE = 3
+BUFFER_STYLE_WRITABLE_FULL = 4
+
+# Buffer transfer data format constants
+DATA_FORMAT_ASCII = 0
+DATA_FORMAT_REAL32 = 1
+DATA_FORMAT_REAL64 = 2
+
 # Digital IO mode constants
 DIGIO_MODE_DIGITAL_IN = 0
 DIGIO_MODE_DIGITAL_OUT = 1
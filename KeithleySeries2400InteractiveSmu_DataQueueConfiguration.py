@@ -44,10 +44,10 @@ class DataQueueConfiguration:
         the success of the method
         """
         if timeout is None:
-            self._mycomms.write(f"result = dataqueue.add({value})")
+            result = self._mycomms.query(f"print(dataqueue.add({value}))")
         else:
-            self._mycomms.write(f"result = dataqueue.add({value}, {timeout})")
-        result = self._mycomms.query("print(result)")
+            result = self._mycomms.query(
+                f"print(dataqueue.add({value}, {timeout}))")
         if "true" in result.lower():
             bool_return = True
         elif "false" in result.loweer():
@@ -62,8 +62,7 @@ class DataQueueConfiguration:
         :return count: The variable that is assigned the value of
         dataqueue.CAPACITY
         """
-        self._mycomms.write("count = dataqueue.CAPACITY")
-        _count = int(self._mycomms.query("print(count)"))
+        _count = int(self._mycomms.query_attribute("dataqueue.CAPACITY"))
         return _count
 
     def clear(self):
@@ -72,7 +71,7 @@ class DataQueueConfiguration:
 
         :return: None
         """
-        self._mycomms.write("count = dataqueue.clear()")
+        self._mycomms.write("dataqueue.clear()")
 
     def count(self):
         """
@@ -80,8 +79,7 @@ class DataQueueConfiguration:
 
         :return: count
         """
-        self._mycomms.write("count = dataqueue.count")
-        _count = int(self._mycomms.query("print(count)"))
+        _count = int(self._mycomms.query("print(dataqueue.count)"))
         return _count
 
     def next(self, timeout=None):
@@ -92,8 +90,8 @@ class DataQueueConfiguration:
         :return value: The next entry in the data queue
         """
         if timeout is None:
-            self._mycomms.write("value = dataqueue.next()")
+            value = float(self._mycomms.query("print(dataqueue.next())"))
         else:
-            self._mycomms.write("value = dataqueue.next(timeout)")
-        value = float(self._mycomms.query("print(value)"))
+            value = float(self._mycomms.query(
+                f"print(dataqueue.next({timeout}))"))
         return value 
@@ -123,8 +123,8 @@ class DigitalIoConfiguration:
             :return
             """
             if state is None:
-                self._mycomms.write(f"state = digio.line[{io_line}].state")
-                state_str = self._mycomms.query("print(state)")
+                state_str = self._mycomms.query(
+                    f"print(digio.line[{io_line}].state)")
                 if "STATE_LOW" in state_str:
                     return _smuconst.DIGIO_STATE_LOW
                 elif "STATE_HIGH" in state_str:
@@ -144,8 +144,7 @@ class DigitalIoConfiguration:
 
         :return: (int) value
         """
-        self._mycomms.write("data = digio.readport()")
-        value = int(self._mycomms.query("print(data)"))
+        value = int(self._mycomms.query("print(digio.readport())"))
         return value
 
     def writeport(self, data):
@@ -49,21 +49,40 @@ class EventLogConfiguration:
             event_count = int(self._mycomms.query("print(eventlog.getcount())\
                 ").rstrip())
         else:
-            const_string = ""
-            if event_type is _smuconst.EVENTLOG_SEV_ERROR:
-                const_string = "eventlog.SEV_ERROR"
-            elif event_type is _smuconst.EVENTLOG_SEV_WARN:
-                const_string = "eventlog.SEV_WARN"
-            elif event_type is _smuconst.EVENTLOG_SEV_WARN_OR_ERROR:
-                const_string = "eventlog.SEV_WARN|eventlog.SEV_ERROR"
-            elif event_type is _smuconst.EVENTLOG_SEV_INFO:
-                const_string = "eventlog.SEV_INFO"
-            elif event_type is _smuconst.EVENTLOG_SEV_INFO_OR_ERROR:
-                const_string = "eventlog.SEV_INFO|eventlog.SEV_ERROR"
-            elif event_type is _smuconst.EVENTLOG_SEV_INFO_OR_WARN:
-                const_string = "eventlog.SEV_INFO|eventlog.SEV_WARN"
-            elif event_type is _smuconst.EVENTLOG_SEV_ALL:
-                const_string = "eventlog.SEV_ALL"
+            const_string = self._get_severity_string(event_type)
             event_count = int(self._mycomms.query(f"print(eventlog.getcount\
                 ({const_string}))").rstrip())
         return event_count
+
+    def next(self, event_type=None):
+        """
+        This function returns the oldest unread event message from the event\
+            log and removes it from the unread events.
+
+        :param event_type: Limits the returned event to the given severity,\
+            such as EVENTLOG_SEV_ERROR; all severities if None
+        :return: The event number, message, severity, node, seconds and\
+            fractional seconds of the event as a tab-separated string
+        """
+        if event_type is None:
+            return self._mycomms.query("print(eventlog.next())")
+        const_string = self._get_severity_string(event_type)
+        return self._mycomms.query(f"print(eventlog.next({const_string}))")
+
+    def _get_severity_string(self, event_type):
+        const_string = ""
+        if event_type is _smuconst.EVENTLOG_SEV_ERROR:
+            const_string = "eventlog.SEV_ERROR"
+        elif event_type is _smuconst.EVENTLOG_SEV_WARN:
+            const_string = "eventlog.SEV_WARN"
+        elif event_type is _smuconst.EVENTLOG_SEV_WARN_OR_ERROR:
+            const_string = "eventlog.SEV_WARN|eventlog.SEV_ERROR"
+        elif event_type is _smuconst.EVENTLOG_SEV_INFO:
+            const_string = "eventlog.SEV_INFO"
+        elif event_type is _smuconst.EVENTLOG_SEV_INFO_OR_ERROR:
+            const_string = "eventlog.SEV_INFO|eventlog.SEV_ERROR"
+        elif event_type is _smuconst.EVENTLOG_SEV_INFO_OR_WARN:
+            const_string = "eventlog.SEV_INFO|eventlog.SEV_WARN"
+        elif event_type is _smuconst.EVENTLOG_SEV_ALL:
+            const_string = "eventlog.SEV_ALL"
+        return const_string
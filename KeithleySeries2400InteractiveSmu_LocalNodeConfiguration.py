@@ -38,5 +38,5 @@ class LocalNodeConfiguration:
 
         :return: The model number of the instrument
         """
-        return self._mycomms.query("print(localnode.model)")
+        return self._mycomms.query_attribute("localnode.model")
 
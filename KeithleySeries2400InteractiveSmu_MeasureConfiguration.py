@@ -12,6 +12,11 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 import KeithleySeries2400InteractiveSmu_Constants as _smuconst
 
 
@@ -51,8 +56,7 @@ class MeasureConfiguration:
         :return: Either 0 (smu.OFF) or 1 (smu.ON)
         """
         arange = None
-        self._mycomms.write("autorange = smu.measure.autorange")
-        response = self._mycomms.query("print(autorange)").rstrip()
+        response = self._mycomms.query_attribute("smu.measure.autorange")
         if "ON" in response:
             arange = _smuconst.ON
         else:
@@ -84,8 +88,8 @@ class MeasureConfiguration:
         instrument range
         """
         highrange = None
-        self._mycomms.write("highRange = smu.measure.autorangehigh")
-        highrange = float(self._mycomms.query("print(highRange)").rstrip())
+        highrange = float(self._mycomms.query_attribute(
+            "smu.measure.autorangehigh"))
         return highrange
 
     @autorangehigh.setter
@@ -112,8 +116,8 @@ class MeasureConfiguration:
         instrument range
         """
         lowrange = None
-        self._mycomms.write("lowRange = smu.measure.autorangelow")
-        lowrange = float(self._mycomms.query("print(lowRange)").rstrip())
+        lowrange = float(self._mycomms.query_attribute(
+            "smu.measure.autorangelow"))
         return lowrange
 
     @autorangelow.setter
@@ -137,8 +141,8 @@ class MeasureConfiguration:
 
         :return: Either 1 (ON) or 0 (OFF)
         """
-        self._mycomms.write("state = smu.measure.autorangerebound")
-        response = self._mycomms.query("print(state)").rstrip()
+        response = self._mycomms.query_attribute(
+            "smu.measure.autorangerebound")
         retconstval = None
         if "ON" in response:
             retconstval = _smuconst.ON
@@ -175,8 +179,8 @@ class MeasureConfiguration:
 
             :return: Either 1 (ON) or 0 (OFF)
             """
-            self._mycomms.write("state = smu.measure.autorange.enable")
-            response = self._mycomms.query("print(state)").rstrip()
+            response = self._mycomms.query_attribute(
+                "smu.measure.autorange.enable")
             retconstval = None
             if "ON" in response:
                 retconstval = _smuconst.ON
@@ -311,9 +315,8 @@ class MeasureConfiguration:
             :param list_name:
             :return:
             """
-            self._mycomms.write(f"index_count = smu.measure.configlist.zier(\"\
-                {list_name}\")")
-            return int(self._mycomms.query("print(index_count)"))
+            return int(self._mycomms.query(
+                f"print(smu.measure.configlist.size(\"{list_name}\"))"))
 
         def store(self, list_name, index=None):
             """
@@ -365,8 +368,7 @@ class MeasureConfiguration:
 
         :return: count
         """
-        self._mycomms.write("count=smu.measure.count")
-        count = int(self._mycomms.query("print(count)").rstrip())
+        count = int(self._mycomms.query_attribute("smu.measure.count"))
         return count
 
     @count.setter
@@ -388,8 +390,8 @@ class MeasureConfiguration:
 
         :return: digits
         """""
-        self._mycomms.write("digits=smu.measure.displaydigits")
-        digits = int(self._mycomms.query("print(digits)").rstrip())
+        digits = int(self._mycomms.query_attribute(
+            "smu.measure.displaydigits"))
         return digits
 
     @displaydigits.setter
@@ -411,8 +413,7 @@ class MeasureConfiguration:
 
         :return: Either 0 (FUNC_DC_VOLTAGE) or 1 (FUNC_DC_CURRENT)
         """
-        self._mycomms.write("measfunc = smu.measure.func")
-        response = self._mycomms.query("print(measfunc)").rstrip()
+        response = self._mycomms.query_attribute("smu.measure.func")
         retconstval = None
         if "VOLTAGE" in response:
             retconstval = _smuconst.FUNC_DC_VOLTAGE
@@ -454,8 +455,8 @@ class MeasureConfiguration:
 
             :return: count
             """
-            self._mycomms.write("filterCount=smu.measure.filter.count")
-            count = int(self._mycomms.query("print(filterCount)").rstrip())
+            count = int(self._mycomms.query_attribute(
+                "smu.measure.filter.count"))
             return count
 
         @fcount.setter
@@ -477,8 +478,8 @@ class MeasureConfiguration:
 
             :return: Either 0 (OFF) or 1 (ON)
             """
-            self._mycomms.write("filterState = smu.measure.filter.enable")
-            response = self._mycomms.query("print(filterState)").rstrip()
+            response = self._mycomms.query_attribute(
+                "smu.measure.filter.enable")
             retconstval = None
             if "OFF" in response:
                 retconstval = _smuconst.OFF
@@ -509,8 +510,8 @@ class MeasureConfiguration:
 
             :return:
             """
-            self._mycomms.write("filterType = smu.measure.filter.type")
-            filtertype = self._mycomms.query("print(filterType)").rstrip()
+            filtertype = self._mycomms.query_attribute(
+                "smu.measure.filter.type")
             retconstval = None
             if "MOVING" in filtertype:
                 retconstval = _smuconst.FILTER_MOVING_AVG
@@ -556,9 +557,8 @@ class MeasureConfiguration:
             retconstval = None
 
             if state is None:
-                self._mycomms.write(f"state=smu.measure.limit[{limit_number}].\
-                    audible")
-                audible = self._mycomms.query("print(state)").rstrip()
+                audible = self._mycomms.query_attribute(
+                    f"smu.measure.limit[{limit_number}].audible")
                 if "NONE" in audible:
                     retconstval = _smuconst.AUDIBLE_NONE
                 elif "FAIL" in audible:
@@ -590,9 +590,8 @@ class MeasureConfiguration:
             retconstval = None
 
             if state is None:
-                self._mycomms.write(f"state=smu.measure.limit[{limit_number}].\
-                    autoclear")
-                audible = self._mycomms.query("print(state)").rstrip()
+                audible = self._mycomms.query_attribute(
+                    f"smu.measure.limit[{limit_number}].autoclear")
                 if "ON" in audible:
                     retconstval = _smuconst.ON
                 elif "OFF" in audible:
@@ -629,9 +628,8 @@ class MeasureConfiguration:
             retconstval = None
 
             if state is None:
-                self._mycomms.write(f"state=smu.measure.limit[{limit_number}].\
-                    enable")
-                audible = self._mycomms.query("print(state)").rstrip()
+                audible = self._mycomms.query_attribute(
+                    f"smu.measure.limit[{limit_number}].enable")
                 if "ON" in audible:
                     retconstval = _smuconst.ON
                 elif "OFF" in audible:
@@ -655,9 +653,8 @@ class MeasureConfiguration:
             """
             retconstval = None
 
-            self._mycomms.write(f"result=smu.measure.limit[{limit_number}].\
-                fail")
-            audible = self._mycomms.query("print(result)").rstrip()
+            audible = self._mycomms.query(
+                f"print(smu.measure.limit[{limit_number}].fail)")
 
             if "NONE" in audible:
                 retconstval = _smuconst.FAIL_NONE
@@ -685,15 +682,11 @@ class MeasureConfiguration:
             limit_value = 0.0
             if value is None:
                 if high_or_low == _smuconst.FAIL_HIGH:
-                    self._mycomms.write(f"highLimit=smu.measure.limit[\
-                        {limit_number}].high.value")
-                    limit_value = self._mycomms.query("print(highLimit)")\
-                        .rstrip()
+                    limit_value = self._mycomms.query_attribute(
+                        f"smu.measure.limit[{limit_number}].high.value")
                 elif high_or_low == _smuconst.FAIL_LOW:
-                    self._mycomms.write(f"lowLimit=smu.measure.limit[\
-                        {limit_number}].low.value")
-                    limit_value = self._mycomms.query("print(lowLimit)").\
-                        rstrip()
+                    limit_value = self._mycomms.query_attribute(
+                        f"smu.measure.limit[{limit_number}].low.value")
             else:
                 if high_or_low == _smuconst.FAIL_HIGH:
                     self._mycomms.write(f"smu.measure.limit[{limit_number}].\
@@ -722,8 +715,8 @@ class MeasureConfiguration:
             retconstval = None
 
             if state is None:
-                self._mycomms.write("state = smu.measure.math.enable")
-                state = self._mycomms.query("print(state)").rstrip()
+                state = self._mycomms.query_attribute(
+                    "smu.measure.math.enable")
                 if "ON" in state:
                     retconstval = _smuconst.ON
                 elif "OFF" in state:
@@ -746,8 +739,8 @@ class MeasureConfiguration:
             retconstval = None
 
             if operation is None:
-                self._mycomms.write("operation = smu.measure.math.format")
-                operation = self._mycomms.query("print(operation)").rstrip()
+                operation = self._mycomms.query_attribute(
+                    "smu.measure.math.format")
                 if "MXB" in operation:
                     retconstval = _smuconst.MATH_MXB
                 elif "PERCENT" in operation:
@@ -779,8 +772,8 @@ class MeasureConfiguration:
             retconstval = None
 
             if value is None:
-                self._mycomms.write("value = smu.measure.math.mxb.bfactor")
-                value = self._mycomms.query("print(value)").rstrip()
+                value = self._mycomms.query_attribute(
+                    "smu.measure.math.mxb.bfactor")
                 retconstval = value
             else:
                 self._mycomms.write("smu.measure.math.mxb.bfactor = {value}")
@@ -798,8 +791,8 @@ class MeasureConfiguration:
             retconstval = None
 
             if value is None:
-                self._mycomms.write("value = smu.measure.math.mxb.mfactor")
-                value = self._mycomms.query("print(value)").rstrip()
+                value = self._mycomms.query_attribute(
+                    "smu.measure.math.mxb.mfactor")
                 retconstval = value
             else:
                 self._mycomms.write("smu.measure.math.mxb.mfactor = {value}")
@@ -817,8 +810,8 @@ class MeasureConfiguration:
             retconstval = None
 
             if value is None:
-                self._mycomms.write("value = smu.measure.math.percent")
-                value = self._mycomms.query("print(value)").rstrip()
+                value = self._mycomms.query_attribute(
+                    "smu.measure.math.percent")
                 retconstval = value
             else:
                 self._mycomms.write("smu.measure.math.percent = {value}")
@@ -832,8 +825,7 @@ class MeasureConfiguration:
 
         :return: nplc
         """
-        self._mycomms.write("nplc=smu.measure.nplc")
-        nplc = float(self._mycomms.query("print(nplc)").rstrip())
+        nplc = float(self._mycomms.query_attribute("smu.measure.nplc"))
         return nplc
 
     @nplc.setter
@@ -855,8 +847,7 @@ class MeasureConfiguration:
         :return: Disable with 0 (OFF); enable with 1 (ON)
         """
         retval = None
-        self._mycomms.write("state = smu.measure.offsetcompensation")
-        state = self._mycomms.query("print(state)").rstrip()
+        state = self._mycomms.query_attribute("smu.measure.offsetcompensation")
         if "ON" in state:
             retval = _smuconst.ON
         elif "OFF" in state:
@@ -883,8 +874,7 @@ class MeasureConfiguration:
 
         :return: The applied measure range.
         """
-        self._mycomms.write("range_value = smu.measure.range")
-        range_value = float(self._mycomms.query("print(range_value)").rstrip())
+        range_value = float(self._mycomms.query_attribute("smu.measure.range"))
         return range_value
 
     @range.setter
@@ -915,6 +905,47 @@ class MeasureConfiguration:
                 ({buffer_name}))").rstrip())
         return reading
 
+    def read_block(self, count, buffer_name="defbuffer1"):
+        """
+        This function makes count measurements into a reading buffer and
+        returns all of them in the same transaction. smu.measure.count is
+        set for the measurement and restored afterwards.
+
+        :param count: (int) The number of measurements to make
+        :param buffer_name: The name of the reading buffer, which may be a
+        default buffer (defbuffer1 or defbuffer2) or a user-defined buffer;
+        in CONTINUOUS fill mode a block that wraps past the end of the
+        buffer is read back as two ranges. Raises RuntimeError when fewer
+        than count readings are read back, e.g. when the buffer is smaller
+        than the block.
+        :return: The readings, oldest first, as a numpy array when numpy is
+        installed and as a list of floats otherwise
+        """
+        # The first line holds the readings stored before the buffer
+        # wrapped, or is empty; the second holds the rest of the block
+        responses = self._mycomms.query_lines(
+            f"local measurecount = smu.measure.count "
+            f"smu.measure.count = {count} "
+            f"smu.measure.read({buffer_name}) "
+            f"smu.measure.count = measurecount "
+            f"local blockstart = {buffer_name}.endindex - {count} + 1 "
+            f"if blockstart < 1 and {count} <= {buffer_name}.capacity and "
+            f"{buffer_name}.fillmode == buffer.FILL_CONTINUOUS then "
+            f"printbuffer(blockstart + {buffer_name}.capacity, "
+            f"{buffer_name}.capacity, {buffer_name}.readings) "
+            f"else print(\"\") end "
+            f"if blockstart < 1 then blockstart = 1 end "
+            f"printbuffer(blockstart, {buffer_name}.endindex, "
+            f"{buffer_name}.readings)", 2)
+        readings = [float(value) for response in responses
+                    for value in response.split(",") if value.strip()]
+        if len(readings) != count:
+            raise RuntimeError(f"Expected {count} readings from "
+                               f"{buffer_name}, received {len(readings)}")
+        if np is not None:
+            return np.array(readings)
+        return readings
+
     def readwithtime(self, buffer_name=None):
         """
         This function initiates measurements and returns the last actual
@@ -925,19 +956,42 @@ class MeasureConfiguration:
         default buffer (defbuffer1 or defbuffer2) or a user-defined buffer;
         if no buffer is defined, it defaults to defbuffer1
         :return: reading - The last reading of the measurement process;
-                 seocnds - Seconds in UTC format;
+                 seconds - Seconds in UTC format;
                  fractional - Fractional seconds;
         """
-        if buffer_name is None:
-            self._mycomms.write("reading,seconds,fractional=smu.measure.\
-                readwithtime())")
-        else:
-            self._mycomms.write("reading,seconds,fractional=smu.measure.\
-                readwithtime(\"{buffer_name}\")")
-        reading = float(self._mycomms.query("print(reading)").rstrip())
-        seconds = int(self._mycomms.query("print(seconds)").rstrip())
-        fractional = float(self._mycomms.query("print(fractional)").rstrip())
-        return reading, seconds, fractional
+        response = self._mycomms.query(_readwithtime_command(buffer_name))
+        reading, seconds, fractional = _parse_readwithtime(response)
+        return reading, int(seconds), fractional
+
+    def readwithtime_block(self, count, buffer_name=None):
+        """
+        This function makes count timed measurements, sending every
+        readwithtime() call in a single write and reading the results back
+        together. combine_timestamps() in the buffer data module turns the
+        seconds and fractional seconds into timestamps.
+
+        :param count: (int) The number of timed readings to make
+        :param buffer_name: The name of the reading buffer, which may be a
+        default buffer (defbuffer1 or defbuffer2) or a user-defined buffer;
+        if no buffer is defined, it defaults to defbuffer1
+        :return: readings, seconds, fractional - numpy arrays when numpy is
+        installed and lists otherwise; raises RuntimeError when a response
+        is not a timed reading
+        """
+        readings, seconds, fractional = [], [], []
+        if count > 0:
+            responses = self._mycomms.query_many(
+                [_readwithtime_command(buffer_name)] * count)
+            for response in responses:
+                reading, second, fraction = _parse_readwithtime(response)
+                readings.append(reading)
+                seconds.append(int(second))
+                fractional.append(fraction)
+        if np is not None:
+            return (np.array(readings, dtype=np.float64),
+                    np.array(seconds, dtype=np.int64),
+                    np.array(fractional, dtype=np.float64))
+        return readings, seconds, fractional
 
     class Rel:
         """
@@ -954,9 +1008,8 @@ class MeasureConfiguration:
             :return: The internal measurement acquired for the relative offset
             value.
             """
-            self._mycomms.write("relativeValue = smu.measure.rel.acquire()")
-            relative_value = float(self._mycomms.write("print(relative_value)")
-                                   .rstrip())
+            relative_value = float(self._mycomms.query(
+                "print(smu.measure.rel.acquire())"))
             return relative_value
 
         @property
@@ -968,8 +1021,7 @@ class MeasureConfiguration:
             :return: Disabled 0 (OFF); enabled 1 (ON)
             """
             retval = None
-            self._mycomms.write("rel_enable = smu.measure.rel.enable")
-            state = self._mycomms.query("print(rel_enable)").rstrip()
+            state = self._mycomms.query_attribute("smu.measure.rel.enable")
             if "ON" in state:
                 retval = _smuconst.ON
             elif "OFF" in state:
@@ -997,8 +1049,8 @@ class MeasureConfiguration:
 
             :return: Relative offset value for measurements.
             """
-            self._mycomms.write("rel_level = smu.measure.rel.level")
-            level = float(self._mycomms.query("print(rel_level)").rstrip())
+            level = float(self._mycomms.query_attribute(
+                "smu.measure.rel.level"))
             return level
 
         @level.setter
@@ -1016,8 +1068,7 @@ class MeasureConfiguration:
         """
         This attribute selects local (2-wire) or remote (4-wire) sensing.
         """
-        self._mycomms.write("sense_type=smu.measure.sense")
-        sense_type = self._mycomms.query("print(sense_type)")
+        sense_type = self._mycomms.query_attribute("smu.measure.sense")
         return sense_type
 
     @sense.setter
@@ -1040,9 +1091,7 @@ class MeasureConfiguration:
         :return: The units of measure to be displayed for the measurement -
         UNIT_AMP, UNIT_OHM, UNIT_VOLT, or UNIT_WATT
         """
-        self._mycomms.write("unit_of_measure=smu.measure.unit")
-        unit_of_measure = self._mycomms.query("print(unit_of_\
-            measure)").rstrip()
+        unit_of_measure = self._mycomms.query_attribute("smu.measure.unit")
         if "AMP" in unit_of_measure:
             return _smuconst.UNIT_AMP
         elif "OHM" in unit_of_measure:
@@ -1086,9 +1135,26 @@ class MeasureConfiguration:
         :return: delay_time
         """
         if delay_time is None:
-            self._mycomms.write(f"delay_time = smu.measure.userdelay[{n}]")
-            delay_time = float(self._mycomms.query("print(delay_time)"))
+            delay_time = float(self._mycomms.query_attribute(
+                f"smu.measure.userdelay[{n}]"))
             return delay_time
         else:
             self._mycomms.write(f"smu.measure.userdelay[{n}] = {delay_time}")
             return None
+
+
+def _readwithtime_command(buffer_name):
+    if buffer_name is None:
+        return "print(smu.measure.readwithtime())"
+    return f"print(smu.measure.readwithtime({buffer_name}))"
+
+
+def _parse_readwithtime(response):
+    # readwithtime() prints the reading, seconds and fractional seconds
+    fields = response.split()
+    try:
+        if len(fields) == 3:
+            return float(fields[0]), float(fields[1]), float(fields[2])
+    except ValueError:
+        pass
+    raise RuntimeError(f"Unexpected readwithtime response: {response!r}")
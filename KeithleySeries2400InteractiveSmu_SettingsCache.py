@@ -0,0 +1,197 @@
+#  Copyright 2022 Joshua Brown
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import re
+
+# Matches a single TSP attribute assignment such as smu.measure.nplc = 1.0
+_ASSIGNMENT = re.compile(r"^\s*([A-Za-z_][\w.\[\]]*\.[\w.\[\]]+)\s*=\s*"
+                         r"(?!=)(.+?)\s*$")
+
+# Matches values that can be stored as-is: numbers, quoted strings and
+# uppercase enumeration constants (smu.ON, smu.FUNC_DC_VOLTAGE, etc.)
+_LITERAL = re.compile(r"^(?:[-+]?[\d.]+(?:[eE][-+]?\d+)?|\"[^\"]*\"|"
+                      r"[a-z]+\.[A-Z0-9_]+|true|false)$")
+
+# Matches commands that return every setting to its default
+_RESET = re.compile(r"(?<![\w.])reset\(|\*RST")
+
+# Attributes the instrument adjusts on its own when they are written (ranges
+# snap to the nearest valid range) or while measuring (autorange).
+_COERCED_ATTRIBUTES = ("smu.measure.range", "smu.source.range",
+                       "smu.measure.autorangehigh", "smu.measure.autorangelow")
+
+# Writing a function attribute changes every setting stored for that function
+_FUNCTION_ATTRIBUTES = {"smu.measure.func": "smu.measure.",
+                        "smu.source.func": "smu.source."}
+
+# Attributes the instrument may change when another one is written; with
+# source autorange on, writing the level selects a new source range
+_DEPENDENT_ATTRIBUTES = {"smu.source.level": ("smu.source.range",)}
+
+# Lua keywords that make the statements around them conditional or repeated
+_CONTROL_KEYWORDS = ("if", "then", "else", "elseif", "end", "for", "while",
+                     "do", "repeat", "until", "function", "return")
+
+
+class SettingsCache:
+    """
+    Write-through shadow copy of instrument attribute values. Setters update
+    the cache as their commands are sent and getters are answered locally
+    once an attribute has been read or written.
+    """
+    def __init__(self):
+        self._values = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, attribute):
+        """
+        This function returns the cached value of an attribute.
+
+        :param attribute: (str) The TSP attribute, such as smu.measure.nplc
+        :return: The cached value as a string, or None when it is not cached
+        """
+        value = self._values.get(attribute)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def store(self, attribute, value):
+        """
+        This function records the value of an attribute read from the
+        instrument.
+
+        :param attribute: (str) The TSP attribute
+        :param value: (str) The value printed by the instrument
+        :return: None
+        """
+        self._values[attribute] = value
+
+    def invalidate(self, prefix=None):
+        """
+        This function discards cached values.
+
+        :param prefix: (str) Only discard attributes starting with this
+            prefix; discard everything when None
+        :return: None
+        """
+        if prefix is None:
+            self._values.clear()
+        else:
+            for attribute in [a for a in self._values if a.startswith(prefix)]:
+                del self._values[attribute]
+
+    def reset_counters(self):
+        """
+        This function sets the hit and miss counters back to zero.
+
+        :return: None
+        """
+        self.hits = 0
+        self.misses = 0
+
+    def observe(self, command):
+        """
+        This function updates the cache from a command sent to the instrument.
+        Attribute assignments are stored, and commands that change settings
+        behind the driver's back invalidate the affected entries.
+
+        :param command: (str) The command text that was sent
+        :return: None
+        """
+        for line in command.splitlines():
+            statements = _split_statements(line)
+            if any(statement in _CONTROL_KEYWORDS
+                   for statement in statements):
+                # Whether, or how often, the assignments of a control block
+                # run is unknown; forget the attributes they name
+                for statement in statements:
+                    self._observe_statement(statement, conditional=True)
+            else:
+                for statement in statements:
+                    self._observe_statement(statement)
+
+    def _observe_statement(self, statement, conditional=False):
+        if _RESET.search(statement):
+            self.invalidate()
+            return
+        if "configlist.recall" in statement or \
+           "trigger.model.initiate" in statement:
+            # Configuration lists, including those recalled by trigger model
+            # blocks, may change any smu setting
+            self.invalidate("smu.")
+            return
+
+        if "smu.measure.read" in statement or \
+           "smu.measure.rel.acquire" in statement:
+            for attribute in _COERCED_ATTRIBUTES:
+                self._values.pop(attribute, None)
+            self._values.pop("smu.measure.rel.level", None)
+
+        match = _ASSIGNMENT.match(re.sub(r"\s*\.\s*", ".", statement))
+        if match is None:
+            return
+        attribute, value = match.group(1), match.group(2)
+
+        if attribute in _FUNCTION_ATTRIBUTES:
+            self.invalidate(_FUNCTION_ATTRIBUTES[attribute])
+        for dependent in _DEPENDENT_ATTRIBUTES.get(attribute, ()):
+            self._values.pop(dependent, None)
+        if conditional or attribute in _COERCED_ATTRIBUTES or \
+           not _LITERAL.match(value):
+            self._values.pop(attribute, None)
+            if attribute.endswith(".range"):
+                self._values.pop(attribute.replace(".range", ".autorange"),
+                                 None)
+        else:
+            self._values[attribute] = value
+
+
+def _split_statements(line):
+    # Splits a line holding several statements, such as
+    # "format.data = format.REAL64 format.byteorder = format.LITTLEENDIAN",
+    # at the spaces and semicolons between them. Operators, and the and/or
+    # keywords, join their operands back into one statement.
+    tokens = []
+    depth = 0
+    quote = None
+    start = 0
+    for index, character in enumerate(line + " "):
+        if quote is not None:
+            if character == quote:
+                quote = None
+        elif character in "\"'":
+            quote = character
+        elif character in "([{":
+            depth += 1
+        elif character in ")]}":
+            depth -= 1
+        elif depth == 0 and (character.isspace() or character == ";"):
+            if index > start:
+                tokens.append(line[start:index])
+            start = index + 1
+
+    statements = []
+    for token in tokens:
+        if statements and (token[0] in "=([.,+-*/<>~" or
+                           token in ("and", "or") or
+                           statements[-1][-1] in "=.,+-*/<>" or
+                           statements[-1].endswith((" and", " or")) or
+                           statements[-1] == "local"):
+            statements[-1] += " " + token
+        else:
+            statements.append(token)
+    return statements
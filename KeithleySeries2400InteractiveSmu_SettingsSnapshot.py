@@ -0,0 +1,219 @@
+#  Copyright 2022 Joshua Brown
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import collections
+import json
+import re
+
+try:
+    import tomllib
+except ImportError:
+    tomllib = None
+
+# The attributes captured by a settings snapshot, in the order they are
+# restored: functions first since they select the settings that follow,
+# ranges before the level and autorange they would otherwise override,
+# the values of filter, rel, math and limit before their enables, and the
+# output state last. Measure and source settings are those of the selected
+# functions.
+SNAPSHOT_ATTRIBUTES = (
+    "smu.source.func", "smu.measure.func", "smu.terminals",
+    "smu.measure.sense", "smu.source.offmode",
+    "smu.source.range", "smu.source.level", "smu.source.autorange",
+    "smu.source.delay", "smu.source.readback", "smu.source.ilimit.level",
+    "smu.source.vlimit.level",
+    "smu.measure.range", "smu.measure.autorange", "smu.measure.nplc",
+    "smu.measure.count", "smu.measure.autozero.enable",
+    "smu.measure.displaydigits", "smu.measure.unit",
+    "smu.measure.filter.type", "smu.measure.filter.count",
+    "smu.measure.filter.enable",
+    "smu.measure.rel.level", "smu.measure.rel.enable",
+    "smu.measure.math.format", "smu.measure.math.mxb.mfactor",
+    "smu.measure.math.mxb.bfactor", "smu.measure.math.percent",
+    "smu.measure.math.enable",
+    "smu.measure.limit[1].low.value", "smu.measure.limit[1].high.value",
+    "smu.measure.limit[1].audible", "smu.measure.limit[1].autoclear",
+    "smu.measure.limit[1].enable",
+    "smu.measure.limit[2].low.value", "smu.measure.limit[2].high.value",
+    "smu.measure.limit[2].audible", "smu.measure.limit[2].autoclear",
+    "smu.measure.limit[2].enable",
+    "smu.source.output")
+
+
+def field_name(attribute):
+    """
+    This function names the snapshot field of a TSP attribute, e.g.\
+        measure_limit1_low_value for smu.measure.limit[1].low.value.
+
+    :param attribute: (str) The TSP attribute
+    :return: (str) The field name
+    """
+    name = re.sub(r"\[(\d+)\]", r"\1", attribute)
+    if name.startswith("smu."):
+        name = name[len("smu."):]
+    return name.replace(".", "_")
+
+
+# An immutable record of the captured settings; fields follow
+# SNAPSHOT_ATTRIBUTES and hold floats for numbers, strings for enumerated
+# values such as smu.ON, and None for attributes the instrument reported as
+# nil
+SettingsSnapshot = collections.namedtuple(
+    "SettingsSnapshot", [field_name(attribute)
+                         for attribute in SNAPSHOT_ATTRIBUTES])
+
+# Prints every captured attribute on one tab-delimited line
+SNAPSHOT_COMMAND = f"print({', '.join(SNAPSHOT_ATTRIBUTES)})"
+
+
+def parse_snapshot(response):
+    """
+    This function parses the line printed by SNAPSHOT_COMMAND.
+
+    :param response: (str) The printed line
+    :return: A SettingsSnapshot
+    """
+    fields = response.rstrip("\r\n").split("\t")
+    if len(fields) != len(SNAPSHOT_ATTRIBUTES):
+        raise ValueError(f"Expected {len(SNAPSHOT_ATTRIBUTES)} settings, "
+                         f"received {len(fields)}")
+    return SettingsSnapshot(*(_value(field.strip()) for field in fields))
+
+
+def restore_commands(snapshot):
+    """
+    This function lists the assignments that return the instrument to a\
+        snapshot, in restore order. An output that is off is switched off\
+        first rather than last, so nothing is sourced while the other\
+        settings change.
+
+    :param snapshot: A SettingsSnapshot
+    :return: A list of TSP assignment commands
+    """
+    commands = []
+    for attribute, value in zip(SNAPSHOT_ATTRIBUTES, snapshot):
+        if value is None:
+            continue
+        command = f"{attribute} = {_literal(value)}"
+        if attribute == "smu.source.output" and value == "smu.OFF":
+            commands.insert(0, command)
+        else:
+            commands.append(command)
+    return commands
+
+
+def _value(field):
+    if field == "nil":
+        return None
+    try:
+        return float(field)
+    except ValueError:
+        return field
+
+
+def _literal(value):
+    if isinstance(value, float):
+        return repr(value)
+    return value
+
+
+def load_profile(path):
+    """
+    This function reads a configuration profile from a JSON or TOML file.\
+        A profile maps snapshot fields to the values wanted, either flat\
+        ({"measure_nplc": 1}) or nested by field name parts\
+        ({"measure": {"nplc": 1}}); true and false stand for smu.ON and\
+        smu.OFF.
+
+    :param path: The path of a .json or .toml file
+    :return: A dictionary mapping snapshot field names to values
+    """
+    path = str(path)
+    if path.lower().endswith(".toml"):
+        if tomllib is None:
+            raise ImportError("tomllib (Python 3.11+) is required for TOML "
+                              "profiles")
+        with open(path, "rb") as profile_file:
+            document = tomllib.load(profile_file)
+    else:
+        with open(path, "r", encoding="utf-8") as profile_file:
+            document = json.load(profile_file)
+    return normalize_profile(document)
+
+
+def normalize_profile(document):
+    """
+    This function flattens a profile and checks its field names and values.
+
+    :param document: A flat or nested dictionary, as load_profile() reads
+    :return: A dictionary mapping snapshot field names to floats or TSP\
+        constant strings
+    """
+    profile = {}
+    for name, value in _flatten(document):
+        if name not in SettingsSnapshot._fields:
+            raise ValueError(f"Unknown profile setting: {name}")
+        if isinstance(value, bool):
+            value = "smu.ON" if value else "smu.OFF"
+        elif isinstance(value, (int, float)):
+            value = float(value)
+        elif not isinstance(value, str):
+            raise ValueError(f"Unsupported value for {name}: {value!r}")
+        profile[name] = value
+    return profile
+
+
+def profile_changes(state, profile):
+    """
+    This function works out the assignments that take the instrument from a\
+        known state to a profile. Settings that already match are skipped;\
+        when a profile changes the measure or source function, every\
+        profile setting of that function is sent since the known values\
+        belonged to the previous function.
+
+    :param state: The SettingsSnapshot last known to hold on the instrument
+    :param profile: A dictionary as returned by normalize_profile()
+    :return: The list of TSP commands in restore order, and the\
+        SettingsSnapshot expected once they are applied
+    """
+    profile = normalize_profile(profile)
+    stale = tuple(f"{group}_" for group in ("measure", "source")
+                  if f"{group}_func" in profile and
+                  profile[f"{group}_func"] != getattr(state, f"{group}_func"))
+
+    changed = {}
+    for name, value in profile.items():
+        if name.startswith(stale) or getattr(state, name) != value:
+            changed[name] = value
+    # The stored settings of a newly selected function are unknown
+    target = state._replace(**{name: None for name in state._fields
+                               if name.startswith(stale)})
+    target = target._replace(**profile)
+    for group in ("measure", "source"):
+        # Writing a range turns autorange off
+        if f"{group}_range" in changed and f"{group}_autorange" not in profile:
+            target = target._replace(**{f"{group}_autorange": "smu.OFF"})
+
+    delta = SettingsSnapshot(*(getattr(target, name) if name in changed
+                               else None for name in SettingsSnapshot._fields))
+    return restore_commands(delta), target
+
+
+def _flatten(document, prefix=""):
+    for key, value in document.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            yield from _flatten(value, f"{name}_")
+        else:
+            yield name, value
@@ -0,0 +1,1350 @@
+#  Copyright 2022 Joshua Brown
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import collections
+import operator
+import random
+import re
+import struct
+import time
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import CommunicationsInterface as comms
+import KeithleySeries2400InteractiveSmu_BufferConfiguration as buffer_config
+import KeithleySeries2400InteractiveSmu_BufferData as buffer_data
+
+# Matches simulator resource strings such as SIM::2450::INSTR; the model is
+# optional and defaults to 2450
+_SIMULATOR_RESOURCE = re.compile(r"^SIM(?:::(\d{4}))?(?:::INSTR)?$",
+                                 re.IGNORECASE)
+
+OVERFLOW_READING = buffer_data.OVERFLOW_READING
+
+# Status bits recorded in the statuses and sourcestatuses buffer columns
+STAT_QUESTIONABLE = buffer_data.STAT_QUESTIONABLE
+STAT_TERMINAL = buffer_data.STAT_TERMINAL
+SOURCE_STAT_SENSE = buffer_data.SOURCE_STAT_SENSE
+SOURCE_STAT_LIMIT = buffer_data.SOURCE_STAT_LIMIT
+SOURCE_STAT_OUTPUT = buffer_data.SOURCE_STAT_OUTPUT
+
+_MEASURE_RANGES = {
+    "2450": {"smu.FUNC_DC_VOLTAGE": (0.02, 0.2, 2.0, 20.0, 200.0),
+             "smu.FUNC_DC_CURRENT": (1e-8, 1e-7, 1e-6, 1e-5, 1e-4, 1e-3,
+                                     1e-2, 1e-1, 1.0),
+             "smu.FUNC_RESISTANCE": (2.0, 20.0, 200.0, 2e3, 2e4, 2e5, 2e6,
+                                     2e7, 2e8)},
+    "2460": {"smu.FUNC_DC_VOLTAGE": (0.2, 2.0, 7.0, 10.0, 20.0, 100.0),
+             "smu.FUNC_DC_CURRENT": (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1,
+                                     1.0, 4.0, 5.0, 7.0),
+             "smu.FUNC_RESISTANCE": (0.2, 2.0, 20.0, 200.0, 2e3, 2e4, 2e5,
+                                     2e6, 2e7, 2e8)},
+    "2461": {"smu.FUNC_DC_VOLTAGE": (0.2, 2.0, 7.0, 10.0, 20.0, 100.0),
+             "smu.FUNC_DC_CURRENT": (1e-6, 1e-5, 1e-4, 1e-3, 1e-2, 1e-1,
+                                     1.0, 4.0, 5.0, 7.0, 10.0),
+             "smu.FUNC_RESISTANCE": (0.2, 2.0, 20.0, 200.0, 2e3, 2e4, 2e5,
+                                     2e6, 2e7, 2e8)},
+}
+
+_UNITS = {"smu.FUNC_DC_VOLTAGE": ("Volt DC", "V"),
+          "smu.FUNC_DC_CURRENT": ("Amp DC", "A"),
+          "smu.FUNC_RESISTANCE": ("Ohm", "Ohm")}
+
+_MEASURE_DEFAULTS = {
+    "smu.measure.nplc": 1.0,
+    "smu.measure.count": 1.0,
+    "smu.measure.autorange": "smu.ON",
+    "smu.measure.autorangerebound": "smu.OFF",
+    "smu.measure.autozero.enable": "smu.ON",
+    "smu.measure.displaydigits": "smu.DIGITS_5_5",
+    "smu.measure.filter.enable": "smu.OFF",
+    "smu.measure.filter.count": 10.0,
+    "smu.measure.math.enable": "smu.OFF",
+    "smu.measure.math.mxb.mfactor": 1.0,
+    "smu.measure.math.mxb.bfactor": 0.0,
+    "smu.measure.offsetcompensation": "smu.OFF",
+    "smu.measure.rel.enable": "smu.OFF",
+    "smu.measure.rel.level": 0.0,
+    "smu.measure.sense": "smu.SENSE_2WIRE",
+}
+
+_SOURCE_DEFAULTS = {
+    "smu.FUNC_DC_VOLTAGE": {"smu.source.range": 0.02,
+                            "smu.source.ilimit.level": 1.05e-4},
+    "smu.FUNC_DC_CURRENT": {"smu.source.range": 1e-8,
+                            "smu.source.vlimit.level": 21.0},
+}
+
+_COMMON_SOURCE_DEFAULTS = {
+    "smu.source.level": 0.0,
+    "smu.source.autorange": "smu.ON",
+    "smu.source.autodelay": "smu.ON",
+    "smu.source.delay": 0.0,
+    "smu.source.readback": "smu.ON",
+}
+
+_GLOBAL_DEFAULTS = {
+    "smu.measure.func": "smu.FUNC_DC_CURRENT",
+    "smu.source.func": "smu.FUNC_DC_VOLTAGE",
+    "smu.source.output": "smu.OFF",
+    "smu.source.offmode": "smu.OFFMODE_NORMAL",
+    "smu.terminals": "smu.TERMINALS_FRONT",
+    "format.data": "format.ASCII",
+    "format.byteorder": "format.LITTLEENDIAN",
+    "format.asciiprecision": 0.0,
+    "localnode.linefreq": 60.0,
+    "tsplink.state": "offline",
+    "tsplink.group": 0.0,
+}
+
+# Attributes kept separately for each measure or source function
+_GLOBAL_SMU_ATTRIBUTES = ("smu.measure.func", "smu.source.func",
+                          "smu.source.output", "smu.source.offmode")
+
+_NUMERIC_CONSTANTS = {
+    "eventlog.SEV_ERROR": 1, "eventlog.SEV_WARN": 2, "eventlog.SEV_INFO": 4,
+    "eventlog.SEV_ALL": 7, "dataqueue.CAPACITY": 128,
+}
+
+# Matches enumeration constants such as smu.ON or trigger.EVENT_TIMER1
+_CONSTANT = re.compile(r"^[a-z]+\.[A-Z][A-Z0-9_]*$")
+_NUMBER = re.compile(r"^[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?$")
+_CALL = re.compile(r"^([A-Za-z_][\w.\[\]\s]*)\((.*)\)$", re.DOTALL)
+_COMPARISON = re.compile(r"==|~=|<=|>=|<|>")
+_COMPARISONS = {"<": operator.lt, ">": operator.gt, "<=": operator.le,
+                ">=": operator.ge}
+_COLUMN_INDEX = re.compile(r"^(\w+)\.(\w+)\[(\d+)\]$")
+
+_MEASURE_OVERHEAD = 0.0002      # seconds per reading on top of the aperture
+
+
+def is_simulator_resource(instrument_resource_string):
+    """
+    This function checks whether a resource string selects the simulator.
+
+    :param instrument_resource_string: (str) The instrument resource string
+    :return: (bool) True for SIM::<model>::INSTR style resource strings
+    """
+    return _SIMULATOR_RESOURCE.match(
+        instrument_resource_string.strip()) is not None
+
+
+class SimulatedCommunications(comms.Communications):
+    """
+    Communications backend that runs the TSP commands sent by the driver on\
+        an in-process SimulatedInstrument instead of a physical 2450, 2460 or\
+        2461. Selected with a SIM::<model>::INSTR resource string; build one\
+        directly and assign it to the driver's instrumentcomms before\
+        initialize() to change the latency or timing options. Responses\
+        become readable once the simulated instrument has finished the\
+        commands ahead of them, so reads block for measurements and\
+        waitcomplete() the way they do on the instrument.
+    """
+    def __init__(self, latency=0.0, command_time=0.0, time_scale=1.0,
+                 load_resistance=1e3, seed=0, timeout=10.0):
+        super().__init__()
+        self.latency = latency
+        self.timeout = timeout
+        self.simulator = SimulatedInstrument(command_time=command_time,
+                                             time_scale=time_scale,
+                                             load_resistance=load_resistance,
+                                             seed=seed)
+        self._output = collections.deque()
+
+    def initialize(self, instrument_resource_string, *args):
+        """
+        This function selects the simulated model from the resource string\
+            and resets the simulated instrument.
+
+        :param instrument_resource_string: (str) SIM::<model>::INSTR, where\
+            model is 2450, 2460 or 2461
+        :return: None
+        """
+        match = _SIMULATOR_RESOURCE.match(instrument_resource_string.strip())
+        if match is None:
+            raise ValueError(f"{instrument_resource_string} is not a "
+                             f"simulator resource")
+        self.simulator.model = match.group(1) or "2450"
+        self.simulator.reset()
+        self._output.clear()
+        return
+
+    def close(self):
+        """
+        Temporary, provisional docstring
+        """
+        return
+
+    def _send(self, command):
+        if self.latency:
+            time.sleep(self.latency)
+        lines = self.simulator.execute(command)
+        ready = self.simulator.busy_until
+        self._output.extend((ready, line) for line in lines)
+
+    def _receive(self):
+        line = self._next_output()
+        if isinstance(line, bytes):
+            return line.decode("latin-1").rstrip()
+        return line
+
+    def _receive_binary(self, datatype, data_points):
+        block = self._next_output()
+        if not isinstance(block, bytes) or not block.startswith(b"#0"):
+            raise OSError(f"Expected a binary block, received {block!r}")
+        byteorder = "<" if self.simulator.little_endian else ">"
+        return np.frombuffer(block[2:], dtype=np.dtype(datatype).newbyteorder(
+            byteorder))
+
+    def _set_timeout(self, timeout):
+        previous = self.timeout
+        self.timeout = timeout
+        return previous
+
+    def _next_output(self):
+        # Waits until the oldest response is ready, or the timeout expires
+        if not self._output:
+            raise TimeoutError("Simulated instrument timed out: no response "
+                               "pending")
+        ready, line = self._output[0]
+        wait = ready - time.perf_counter()
+        if wait > 0:
+            if self.timeout is not None and wait > self.timeout:
+                time.sleep(self.timeout)
+                raise TimeoutError("Simulated instrument timed out")
+            time.sleep(wait)
+        self._output.popleft()
+        return line
+
+
+class SimulatedInstrument:
+    """
+    Interpreter for the subset of TSP emitted by the driver: smu.*\
+        attributes and reads, buffer.make() and reading buffers,\
+        printbuffer(), trigger.model.load()/initiate()/state(), dataqueue,\
+        eventlog, localnode and the common *IDN?/*OPC?/*RST commands.\
+        Readings come from a resistive load and take NPLC-driven time; the\
+        trigger model fills its buffer in the background as time passes.
+    """
+    def __init__(self, model="2450", command_time=0.0, time_scale=1.0,
+                 load_resistance=1e3, seed=0):
+        self.model = model
+        self.command_time = command_time
+        self.time_scale = time_scale
+        self.load_resistance = load_resistance
+        self.noise = 1e-6
+        self._seed = seed
+        self.reset()
+
+    @property
+    def little_endian(self):
+        """
+        This attribute is True when binary data is sent least significant\
+            byte first.
+        """
+        return self._attributes["format.byteorder"] == "format.LITTLEENDIAN"
+
+    def reset(self):
+        """
+        This function returns the simulated instrument to its power-on state.
+
+        :return: None
+        """
+        self._random = random.Random(self._seed)
+        self.busy_until = 0.0
+        self._attributes = dict(_GLOBAL_DEFAULTS)
+        self._globals = {
+            "defbuffer1": SimulatedBuffer(100000, "buffer.STYLE_STANDARD",
+                                          "buffer.FILL_CONTINUOUS"),
+            "defbuffer2": SimulatedBuffer(100000, "buffer.STYLE_STANDARD",
+                                          "buffer.FILL_CONTINUOUS"),
+        }
+        self._locals = {}
+        self._configlists = {}
+        self._dataqueue = collections.deque()
+        self._events = []
+        self._trigger_model = None
+        self._trigger_run = None
+        self._tripped = False
+
+    # ------------------------------------------------------------------
+    # Command parsing
+    # ------------------------------------------------------------------
+    def execute(self, chunk):
+        """
+        This function runs a command, or a newline-joined chunk of commands,\
+            and returns whatever they print.
+
+        :param chunk: (str) The text sent to the instrument
+        :return: A list of output lines; text lines are str and binary\
+            blocks are bytes
+        """
+        output = []
+        # Each line runs as a chunk of its own, except in a script
+        script = False
+        self._locals = {}
+        for line in chunk.splitlines():
+            line = line.strip()
+            if line in ("loadandrunscript", "endscript"):
+                script = line == "loadandrunscript"
+                self._drop_locals()
+            if not line or line in ("loadandrunscript", "endscript"):
+                continue
+            self._execute_block(_split_statements(line), output)
+            if not script:
+                self._drop_locals()
+        self._drop_locals()
+        return output
+
+    def _drop_locals(self):
+        # Ends the scope of the locals declared by the chunk that ran,
+        # uncovering any globals of the same names
+        for name, previous in self._locals.items():
+            if previous is _UNSET:
+                self._globals.pop(name, None)
+            else:
+                self._globals[name] = previous
+        self._locals = {}
+
+    def _execute_block(self, statements, output):
+        index = 0
+        while index < len(statements):
+            statement = statements[index]
+            try:
+                if statement == "if":
+                    index = self._execute_if(statements, index, output)
+                    continue
+                if self.command_time:
+                    self._spend(self.command_time)
+                self._advance()
+                self._execute_statement(statement, output)
+            except _TspError as tsperr:
+                self._post_error(tsperr.code, str(tsperr))
+                if statement == "if":
+                    # The rest of the line belongs to a broken block
+                    return
+            index += 1
+
+    def _execute_if(self, statements, index, output):
+        # Runs the "if <condition> then ... [else ...] end" block starting at
+        # index and returns the index following its end
+        if "then" not in statements[index:]:
+            raise _TspError(-285, "TSP Syntax error: 'then' expected")
+        then = statements.index("then", index)
+        otherwise = None
+        depth = 0
+        for end in range(then + 1, len(statements)):
+            if statements[end] == "if":
+                depth += 1
+            elif statements[end] == "end" and depth > 0:
+                depth -= 1
+            elif statements[end] == "end":
+                break
+            elif statements[end] == "else" and depth == 0:
+                otherwise = end
+        else:
+            raise _TspError(-285, "TSP Syntax error: 'end' expected")
+
+        value = self._evaluate(" ".join(statements[index + 1:then]))[0]
+        if value is not None and value is not False:
+            self._execute_block(statements[then + 1:otherwise or end],
+                                output)
+        elif otherwise is not None:
+            self._execute_block(statements[otherwise + 1:end], output)
+        return end + 1
+
+    def _execute_statement(self, statement, output):
+        if statement.startswith("*"):
+            self._execute_common(statement.upper(), output)
+            return
+
+        if _depth(statement) != 0:
+            raise _TspError(-285, f"TSP Syntax error: unbalanced brackets in "
+                                  f"'{statement}'")
+        # Locals are kept with the globals until their chunk ends
+        if statement.startswith("local "):
+            statement = statement[len("local "):]
+            target, _ = _split_assignment(statement)
+            for name in _split_on(_strip_spaces(target or statement), ","):
+                self._locals.setdefault(name,
+                                        self._globals.get(name, _UNSET))
+                if target is None:
+                    self._globals[name] = None
+            if target is None:
+                return
+
+        target, value = _split_assignment(statement)
+        if target is not None:
+            targets = _split_on(_strip_spaces(target), ",")
+            values = self._evaluate(value)
+            values += (None,) * (len(targets) - len(values))
+            for name, result in zip(targets, values):
+                self._assign(name, result)
+            return
+
+        # Arguments keep their spaces, which separate and/or operators
+        match = _CALL.match(statement.strip())
+        if match is None:
+            raise _TspError(-285, f"TSP Syntax error: unexpected symbol near "
+                                  f"'{statement}'")
+        name, arguments = _strip_spaces(match.group(1)), match.group(2)
+        if name == "print":
+            values = []
+            for argument in _split_arguments(arguments):
+                values.extend(self._evaluate(argument))
+            output.append("\t".join(_format(value) for value in values))
+        elif name == "printbuffer":
+            output.append(self._printbuffer(
+                [self._evaluate(argument)[0]
+                 for argument in _split_arguments(arguments)]))
+        else:
+            self._call(name, arguments)
+
+    def _execute_common(self, command, output):
+        if command == "*IDN?":
+            output.append(f"KEITHLEY INSTRUMENTS,MODEL {self.model},"
+                          f"00000000,1.0.0s")
+        elif command == "*OPC?":
+            self._wait_complete()
+            output.append("1")
+        elif command == "*RST":
+            self.reset()
+        elif command == "*CLS":
+            self._events = []
+        elif command in ("*WAI", "*OPC"):
+            self._wait_complete()
+        else:
+            raise _TspError(-113, f"Undefined header {command}")
+
+    def _evaluate(self, expression):
+        # Returns a tuple since TSP functions may return several values
+        for operator in ("or", "and"):
+            operands = _split_keyword(expression, operator)
+            if len(operands) > 1:
+                for operand in operands:
+                    value = self._evaluate(operand)[0]
+                    falsy = value is None or value is False
+                    # or stops at the first truthy operand, and at the
+                    # first falsy one
+                    if falsy == (operator == "and"):
+                        return (value,)
+                return (value,)
+        raw_expression = expression.strip()
+        expression = _strip_spaces(expression)
+        if expression == "":
+            return (None,)
+        comparison = _split_comparison(expression)
+        if comparison is not None:
+            left, operator, right = comparison
+            left = self._evaluate(left)[0]
+            right = self._evaluate(right)[0]
+            if operator == "==":
+                return (left == right,)
+            if operator == "~=":
+                return (left != right,)
+            if not isinstance(left, float) or not isinstance(right, float):
+                raise _TspError(-285, f"attempt to compare {_format(left)} "
+                                      f"with {_format(right)}")
+            return (_COMPARISONS[operator](left, right),)
+        parts = _split_on(expression, "|")
+        if len(parts) > 1:
+            result = 0
+            for part in parts:
+                result |= int(self._evaluate(part)[0] or 0)
+            return (float(result),)
+        if _NUMBER.match(expression):
+            return (float(expression),)
+        if expression[0] in "\"'":
+            return (expression[1:-1],)
+        if expression in ("true", "false"):
+            return (expression == "true",)
+        if expression == "nil":
+            return (None,)
+        terms = _split_sum(expression)
+        if len(terms) > 1:
+            total = 0.0
+            for sign, term in terms:
+                value = float(self._evaluate(term)[0])
+                total += -value if sign == "-" else value
+            return (total,)
+
+        match = _CALL.match(expression)
+        if match is not None:
+            # Arguments keep their spaces, which separate and/or operators
+            arguments = _CALL.match(raw_expression).group(2)
+            result = self._call(match.group(1), arguments)
+            return result if isinstance(result, tuple) else (result,)
+        return (self._read(expression),)
+
+    # ------------------------------------------------------------------
+    # Attributes
+    # ------------------------------------------------------------------
+    def _key(self, attribute):
+        if attribute.startswith("smu.measure.") and \
+           attribute not in _GLOBAL_SMU_ATTRIBUTES:
+            return f"{self._measure_func}|{attribute}"
+        if attribute.startswith("smu.source.") and \
+           attribute not in _GLOBAL_SMU_ATTRIBUTES:
+            return f"{self._source_func}|{attribute}"
+        return attribute
+
+    @property
+    def _measure_func(self):
+        return self._attributes["smu.measure.func"]
+
+    @property
+    def _source_func(self):
+        return self._attributes["smu.source.func"]
+
+    def _get(self, attribute):
+        key = self._key(attribute)
+        if key in self._attributes:
+            return self._attributes[key]
+        if attribute in _MEASURE_DEFAULTS:
+            return _MEASURE_DEFAULTS[attribute]
+        if attribute == "smu.measure.range":
+            return self._ranges("measure")[-1]
+        if attribute == "smu.measure.unit":
+            return {"smu.FUNC_DC_VOLTAGE": "smu.UNIT_VOLT",
+                    "smu.FUNC_DC_CURRENT": "smu.UNIT_AMP",
+                    "smu.FUNC_RESISTANCE": "smu.UNIT_OHM"}[self._measure_func]
+        if attribute in _COMMON_SOURCE_DEFAULTS:
+            return _COMMON_SOURCE_DEFAULTS[attribute]
+        return _SOURCE_DEFAULTS[self._source_func].get(attribute)
+
+    def _read(self, path):
+        if path in _NUMERIC_CONSTANTS:
+            return float(_NUMERIC_CONSTANTS[path])
+        if path in self._globals:
+            return self._globals[path]
+        name, _, fields = path.partition(".")
+        if fields and isinstance(self._globals.get(name), dict):
+            value = self._globals[name]
+            for field in fields.split("."):
+                if not isinstance(value, dict):
+                    raise _TspError(-285, f"attempt to index a nil value "
+                                          f"in '{path}'")
+                value = value.get(field)
+            return value
+        if path == "localnode.model":
+            return self.model
+        if path == "localnode.serialno":
+            return "00000000"
+        if path == "dataqueue.count":
+            return float(len(self._dataqueue))
+        if path in ("smu.source.ilimit.tripped", "smu.source.vlimit.tripped"):
+            return "smu.ON" if self._tripped else "smu.OFF"
+
+        match = _COLUMN_INDEX.match(path)
+        if match is not None and match.group(1) in self._globals:
+            buffer = self._buffer(match.group(1))
+            return buffer.value(match.group(2), int(match.group(3)))
+
+        owner, _, attribute = path.rpartition(".")
+        if owner in self._globals:
+            buffer = self._buffer(owner)
+            if attribute in SimulatedBuffer.COLUMNS:
+                return _BufferColumn(buffer, attribute)
+            return buffer.attribute(attribute)
+
+        if _CONSTANT.match(path):
+            return path
+        if path.startswith("smu."):
+            return self._get(path)
+        return self._attributes.get(path)
+
+    def _assign(self, target, value):
+        if target in self._globals or "." not in target:
+            self._globals[target] = value
+            return
+
+        owner, _, attribute = target.rpartition(".")
+        if owner in self._globals:
+            self._buffer(owner).assign(attribute, value)
+            return
+
+        if target in ("smu.measure.range", "smu.source.range"):
+            function = "measure" if "measure" in target else "source"
+            value = self._coerce_range(function, value)
+            self._attributes[self._key(f"smu.{function}.autorange")] = \
+                "smu.OFF"
+        elif target == "smu.source.level" and isinstance(value, float):
+            if self._get("smu.source.autorange") == "smu.ON":
+                self._attributes[self._key("smu.source.range")] = \
+                    self._coerce_range("source", abs(value))
+        self._attributes[self._key(target)] = value
+
+    def _ranges(self, function):
+        if function == "measure":
+            func = self._measure_func
+        else:
+            func = self._source_func
+        return _MEASURE_RANGES.get(self.model, _MEASURE_RANGES["2450"])[func]
+
+    def _coerce_range(self, function, value):
+        for range_value in self._ranges(function):
+            if abs(value) <= range_value:
+                return range_value
+        raise _TspError(1115, f"Parameter error: range {value} is out of "
+                              f"range")
+
+    # ------------------------------------------------------------------
+    # Functions
+    # ------------------------------------------------------------------
+    def _call(self, name, arguments):
+        args = [self._evaluate(argument)[0]
+                for argument in _split_arguments(arguments)]
+
+        owner, _, method = name.rpartition(".")
+        if owner in self._globals:
+            return self._buffer(owner).call(method, args)
+
+        handler = self._FUNCTIONS.get(name)
+        if handler is not None:
+            return handler(self, *args)
+        if name.startswith(_IGNORED_FUNCTIONS):
+            return None
+        raise _TspError(-285, f"TSP Syntax error: attempt to call a nil "
+                              f"value (field '{name}')")
+
+    def _spend(self, seconds):
+        # Takes instrument time: whatever is printed afterwards cannot be
+        # read before the instrument gets there
+        self.busy_until = max(self.busy_until, time.perf_counter()) + seconds
+
+    def _wait_complete(self):
+        run = self._trigger_run
+        if run is not None:
+            self.busy_until = max(self.busy_until, run.finished)
+            self._advance(force=True)
+
+    def _advance(self, force=False):
+        # Adds the readings the running trigger model has made by now
+        run = self._trigger_run
+        if run is None:
+            return
+        if force or self.time_scale == 0:
+            due = run.count
+        else:
+            elapsed = (time.perf_counter() - run.started) / self.time_scale
+            due = min(run.count, int(elapsed / run.period))
+        while run.made < due:
+            reading, source_value, status, source_status = self._measure()
+            run.buffer.append(reading, source_value, status, source_status,
+                              run.epoch + run.made * run.period,
+                              self._measure_func, self._source_func)
+            run.made += 1
+        if run.made >= run.count:
+            self._trigger_run = None
+
+    def _aperture(self):
+        return self._get("smu.measure.nplc") / \
+            self._attributes["localnode.linefreq"] + _MEASURE_OVERHEAD
+
+    def _measure(self):
+        source_level = self._get("smu.source.level")
+        resistance = self.load_resistance
+        self._tripped = False
+        if self._attributes["smu.source.output"] != "smu.ON":
+            voltage = current = 0.0
+        elif self._source_func == "smu.FUNC_DC_VOLTAGE":
+            voltage, current = source_level, source_level / resistance
+            limit = self._get("smu.source.ilimit.level")
+            if abs(current) > limit:
+                self._tripped = True
+                current = limit if current > 0 else -limit
+                voltage = current * resistance
+        else:
+            current, voltage = source_level, source_level * resistance
+            limit = self._get("smu.source.vlimit.level")
+            if abs(voltage) > limit:
+                self._tripped = True
+                voltage = limit if voltage > 0 else -limit
+                current = voltage / resistance
+
+        if self._measure_func == "smu.FUNC_DC_VOLTAGE":
+            reading = voltage
+        elif self._measure_func == "smu.FUNC_DC_CURRENT":
+            reading = current
+        else:
+            reading = voltage / current if current else OVERFLOW_READING
+
+        status = STAT_TERMINAL \
+            if self._attributes["smu.terminals"] == "smu.TERMINALS_FRONT" \
+            else 0
+        if reading != OVERFLOW_READING:
+            if self._get("smu.measure.autorange") == "smu.ON":
+                self._attributes[self._key("smu.measure.range")] = \
+                    self._autorange(reading)
+            measure_range = self._get("smu.measure.range")
+            reading += self._random.gauss(0.0, self.noise * measure_range)
+            if abs(reading) > measure_range * 1.05:
+                reading = OVERFLOW_READING
+        if reading == OVERFLOW_READING:
+            status |= STAT_QUESTIONABLE
+        else:
+            if self._get("smu.measure.rel.enable") == "smu.ON":
+                reading -= self._get("smu.measure.rel.level")
+            if self._get("smu.measure.math.enable") == "smu.ON":
+                reading = reading * self._get("smu.measure.math.mxb.mfactor") \
+                    + self._get("smu.measure.math.mxb.bfactor")
+
+        source_status = SOURCE_STAT_LIMIT if self._tripped else 0
+        if self._attributes["smu.source.output"] == "smu.ON":
+            source_status |= SOURCE_STAT_OUTPUT
+        if self._get("smu.measure.sense") == "smu.SENSE_4WIRE":
+            source_status |= SOURCE_STAT_SENSE
+        if self._source_func == "smu.FUNC_DC_VOLTAGE":
+            source_value = voltage
+        else:
+            source_value = current
+        return reading, source_value, status, source_status
+
+    def _autorange(self, reading):
+        ranges = self._ranges("measure")
+        for range_value in ranges:
+            if abs(reading) <= range_value:
+                return range_value
+        return ranges[-1]
+
+    def _measure_read(self, buffer=None):
+        if buffer is None:
+            buffer = self._buffer("defbuffer1")
+        count = int(self._get("smu.measure.count"))
+        self._spend(count * self._aperture() * self.time_scale)
+        reading = None
+        for _ in range(count):
+            reading, source_value, status, source_status = self._measure()
+            buffer.append(reading, source_value, status, source_status,
+                          time.time(), self._measure_func, self._source_func)
+        return reading
+
+    def _measure_readwithtime(self, buffer=None):
+        reading = self._measure_read(buffer)
+        if buffer is None:
+            buffer = self._buffer("defbuffer1")
+        seconds = buffer.value("seconds", int(buffer.attribute("endindex")))
+        fractional = buffer.value("fractionalseconds",
+                                  int(buffer.attribute("endindex")))
+        return reading, seconds, fractional
+
+    def _rel_acquire(self):
+        self._spend(self._aperture() * self.time_scale)
+        level = self._measure()[0]
+        self._attributes[self._key("smu.measure.rel.level")] = level
+        return level
+
+    def _buffer(self, name):
+        buffer = self._globals.get(name)
+        if not isinstance(buffer, SimulatedBuffer):
+            raise _TspError(-285, f"{name} is not a reading buffer")
+        return buffer
+
+    def _buffer_make(self, capacity, style=None):
+        return SimulatedBuffer(int(capacity),
+                               style or "buffer.STYLE_STANDARD",
+                               "buffer.FILL_CONTINUOUS")
+
+    def _buffer_delete(self, buffer):
+        for name in [name for name, value in self._globals.items()
+                     if value is buffer]:
+            del self._globals[name]
+
+    def _buffer_getstats(self, buffer):
+        return buffer.statistics()
+
+    def _buffer_clearstats(self, buffer=None):
+        buffers = [buffer] if buffer is not None else \
+            [value for value in self._globals.values()
+             if isinstance(value, SimulatedBuffer)]
+        for each in buffers:
+            each.clearstats()
+
+    def _printbuffer(self, args):
+        if len(args) < 3:
+            raise _TspError(-285, "printbuffer() requires a start, an end "
+                                  "and at least one buffer column")
+        start, end, columns = int(args[0]), int(args[1]), args[2:]
+        for column in columns:
+            if not isinstance(column, _BufferColumn):
+                raise _TspError(-285, "printbuffer() expects buffer columns")
+        values = [column.buffer.value(column.name, index)
+                  for index in range(start, end + 1)
+                  for column in columns]
+
+        if self._attributes["format.data"] == "format.ASCII":
+            return ", ".join(_format(value) for value in values)
+        datatype = "f" if self._attributes["format.data"] == \
+            "format.REAL32" else "d"
+        byteorder = "<" if self.little_endian else ">"
+        try:
+            return b"#0" + struct.pack(f"{byteorder}{len(values)}{datatype}",
+                                       *values)
+        except struct.error:
+            raise _TspError(-285, "printbuffer() cannot send text columns as "
+                                  "binary data")
+
+    def _trigger_load(self, template, *args):
+        if template == "Empty":
+            self._trigger_model = None
+            return
+        if template not in ("SimpleLoop", "DurationLoop"):
+            raise _TspError(1115, f"Parameter error: trigger model template "
+                                  f"{template} is not simulated")
+        args = list(args) + [None] * 3
+        buffer = args[2] if args[2] is not None else \
+            self._buffer("defbuffer1")
+        self._trigger_model = (template, args[0], args[1] or 0.0, buffer)
+
+    def _trigger_setblock(self, block_number, block_type, *args):
+        # Custom models run each measure block once; branches are ignored
+        if self._trigger_model is None or \
+           self._trigger_model[0] != "Blocks":
+            self._trigger_model = ("Blocks", {}, 0.0, None)
+        self._trigger_model[1][int(block_number)] = (block_type, args)
+
+    def _trigger_initiate(self):
+        if self._trigger_run is not None:
+            raise _TspError(-285, "Trigger model is already running")
+        if self._trigger_model is None:
+            raise _TspError(-285, "Trigger model is empty")
+        template, parameter, delay, buffer = self._trigger_model
+        measure_count = int(self._get("smu.measure.count"))
+        period = self._aperture() + delay
+        if template == "SimpleLoop":
+            count = int(parameter)
+        elif template == "DurationLoop":
+            count = max(int(parameter / period), 1)
+        else:
+            count = 0
+            for block_type, block_args in parameter.values():
+                if block_type in ("trigger.BLOCK_MEASURE_DIGITIZE",
+                                  "trigger.BLOCK_MEASURE"):
+                    if block_args and isinstance(block_args[0],
+                                                 SimulatedBuffer):
+                        buffer = block_args[0]
+                    count += int(block_args[1]) if len(block_args) > 1 and \
+                        isinstance(block_args[1], float) else measure_count
+            if buffer is None:
+                buffer = self._buffer("defbuffer1")
+        self._trigger_run = _TriggerRun(
+            buffer, count, period, self.time_scale,
+            max(self.busy_until, time.perf_counter()))
+        self._advance()
+
+    def _trigger_state(self):
+        if self._trigger_run is not None:
+            return "trigger.STATE_RUNNING", "trigger.STATE_RUNNING", 1.0
+        if self._trigger_model is None:
+            return "trigger.STATE_EMPTY", "trigger.STATE_EMPTY", 0.0
+        return "trigger.STATE_IDLE", "trigger.STATE_IDLE", 1.0
+
+    def _trigger_abort(self):
+        self._trigger_run = None
+
+    def _dataqueue_add(self, value, timeout=None):
+        if len(self._dataqueue) >= _NUMERIC_CONSTANTS["dataqueue.CAPACITY"]:
+            return False
+        self._dataqueue.append(value)
+        return True
+
+    def _dataqueue_next(self, timeout=None):
+        if not self._dataqueue:
+            return None
+        return self._dataqueue.popleft()
+
+    def _post_error(self, code, message):
+        self._events.append((float(code), message, 1.0))
+
+    def _eventlog_matches(self, severity, event_type):
+        return event_type is None or int(severity) & int(event_type)
+
+    def _eventlog_next(self, event_type=None):
+        for i, event in enumerate(self._events):
+            if self._eventlog_matches(event[2], event_type):
+                del self._events[i]
+                now = time.time()
+                return (event[0], event[1], event[2], 0.0, float(int(now)),
+                        now % 1)
+        return 0.0, "No error", 0.0, 0.0, 0.0, 0.0
+
+    def _eventlog_getcount(self, event_type=None):
+        return float(sum(1 for event in self._events
+                         if self._eventlog_matches(event[2], event_type)))
+
+    def _eventlog_post(self, message, severity=4.0):
+        self._events.append((0.0, message, severity))
+
+    def _configlist_create(self, name):
+        self._configlists[name] = []
+
+    def _configlist_store(self, name, index=None):
+        prefix = f"{self._measure_func}|smu.measure."
+        settings = {key: value for key, value in self._attributes.items()
+                    if key.startswith(prefix)}
+        configlist = self._configlist(name)
+        if index is None or int(index) > len(configlist):
+            configlist.append(settings)
+        else:
+            configlist[int(index) - 1] = settings
+
+    def _configlist_recall(self, name, index=1, *args):
+        configlist = self._configlist(name)
+        if not 1 <= int(index) <= len(configlist):
+            raise _TspError(2790, f"Configuration list {name} has no index "
+                                  f"{int(index)}")
+        self._attributes.update(configlist[int(index) - 1])
+
+    def _configlist_delete(self, name, index=None):
+        if index is None:
+            self._configlist(name)
+            del self._configlists[name]
+        else:
+            del self._configlist(name)[int(index) - 1]
+
+    def _configlist_size(self, name):
+        return float(len(self._configlist(name)))
+
+    def _configlist_catalog(self):
+        return next(iter(self._configlists), None)
+
+    def _configlist(self, name):
+        if name not in self._configlists:
+            raise _TspError(2790, f"Configuration list {name} does not exist")
+        return self._configlists[name]
+
+    def _delay(self, seconds):
+        self._spend(seconds * self.time_scale)
+
+    _FUNCTIONS = {
+        "reset": reset,
+        "waitcomplete": _wait_complete,
+        "delay": _delay,
+        "available": lambda self, *args: True,
+        "buffer.make": _buffer_make,
+        "buffer.delete": _buffer_delete,
+        "buffer.getstats": _buffer_getstats,
+        "buffer.clearstats": _buffer_clearstats,
+        "smu.measure.read": _measure_read,
+        "smu.measure.readwithtime": _measure_readwithtime,
+        "smu.measure.rel.acquire": _rel_acquire,
+        "trigger.model.load": _trigger_load,
+        "trigger.model.setblock": _trigger_setblock,
+        "trigger.model.initiate": _trigger_initiate,
+        "trigger.model.state": _trigger_state,
+        "trigger.model.abort": _trigger_abort,
+        "dataqueue.add": _dataqueue_add,
+        "dataqueue.next": _dataqueue_next,
+        "dataqueue.clear": lambda self: self._dataqueue.clear(),
+        "eventlog.next": _eventlog_next,
+        "eventlog.getcount": _eventlog_getcount,
+        "eventlog.post": _eventlog_post,
+        "eventlog.clear": lambda self: self._events.clear(),
+        "smu.measure.configlist.create": _configlist_create,
+        "smu.measure.configlist.store": _configlist_store,
+        "smu.measure.configlist.recall": _configlist_recall,
+        "smu.measure.configlist.delete": _configlist_delete,
+        "smu.measure.configlist.size": _configlist_size,
+        "smu.measure.configlist.catalog": _configlist_catalog,
+        "tsplink.initialize": lambda self, *args: 0.0,
+        "digio.readport": lambda self: 0.0,
+    }
+
+
+# Functions accepted without simulating any effect
+_IGNORED_FUNCTIONS = ("beeper.", "display.", "digio.", "tsplink.", "buffer.",
+                      "smu.measure.autorange.once", "smu.measure.limit",
+                      "smu.source.configlist.")
+
+
+class SimulatedBuffer:
+    """
+    Reading buffer of the simulated instrument. Readings are stored in a\
+        ring of capacity slots; indexes address slots the way startindex and\
+        endindex do on the instrument, so in CONTINUOUS fill mode the oldest\
+        reading is overwritten once the buffer is full.
+    """
+    COLUMNS = ("readings", "relativetimestamps", "formattedreadings",
+               "fractionalseconds", "extravalues", "extravalueunits",
+               "extraformattedvalues", "dates", "seconds",
+               "sourceformattedvalues", "sourcestatuses", "sourceunits",
+               "sourcevalues", "statuses", "times", "timestamps", "units")
+
+    def __init__(self, capacity, style, fillmode):
+        styles = {name: style for style, name in
+                  buffer_config.BUFFER_STYLES.items()}
+        if style not in styles:
+            raise _TspError(-285, f"Unknown buffer style {style}")
+        self.capacity = capacity
+        self.style = style
+        self.stored_columns = buffer_config.STYLE_COLUMNS[styles[style]]
+        self.fillmode = fillmode
+        self.clear()
+
+    def clear(self):
+        """
+        This function removes every reading from the buffer.
+
+        :return: None
+        """
+        self._records = []
+        self.total = 0
+        self._first_time = None
+        self._stats_from = 0
+
+    def append(self, reading, source_value, status, source_status, timestamp,
+               measure_func, source_func):
+        """
+        This function stores one reading.
+
+        :return: None
+        """
+        if self.fillmode == "buffer.FILL_ONCE" and self.total >= self.capacity:
+            return
+        if self._first_time is None:
+            self._first_time = timestamp
+        record = (reading, source_value, float(status), float(source_status),
+                  timestamp, timestamp - self._first_time, measure_func,
+                  source_func)
+        if len(self._records) < self.capacity:
+            self._records.append(record)
+        else:
+            self._records[self.total % self.capacity] = record
+        self.total += 1
+
+    def clearstats(self):
+        """
+        This function restarts the statistics at the next reading.
+
+        :return: None
+        """
+        self._stats_from = self.total
+
+    def statistics(self):
+        """
+        This function computes the table buffer.getstats() returns for the\
+            readings stored since the statistics were last cleared.
+
+        :return: A dict with n, mean, stddev, min and max; min and max hold\
+            the reading and its seconds and fractionalseconds
+        """
+        count = min(self.total - self._stats_from, len(self._records))
+        records = [self._records[index % self.capacity]
+                   for index in range(self.total - count, self.total)]
+        readings = [record[0] for record in records]
+        if not readings:
+            return {"n": 0.0, "mean": None, "stddev": None, "min": None,
+                    "max": None}
+
+        def extreme(record):
+            return {"reading": record[0],
+                    "seconds": float(int(record[4])),
+                    "fractionalseconds": record[4] % 1}
+
+        mean = sum(readings) / len(readings)
+        variance = sum((reading - mean) ** 2 for reading in readings) / \
+            (len(readings) - 1) if len(readings) > 1 else 0.0
+        return {"n": float(len(readings)), "mean": mean,
+                "stddev": variance ** 0.5,
+                "min": extreme(min(records, key=lambda record: record[0])),
+                "max": extreme(max(records, key=lambda record: record[0]))}
+
+    def attribute(self, name):
+        """
+        This function reads a buffer attribute such as n or endindex.
+
+        :param name: (str) The attribute name
+        :return: The attribute value
+        """
+        if name == "n":
+            return float(len(self._records))
+        if name == "capacity":
+            return float(self.capacity)
+        if name == "fillmode":
+            return self.fillmode
+        if name == "startindex":
+            if not self._records:
+                return 0.0
+            if self.total <= self.capacity:
+                return 1.0
+            return float(self.total % self.capacity + 1)
+        if name == "endindex":
+            if not self._records:
+                return 0.0
+            return float((self.total - 1) % self.capacity + 1)
+        raise _TspError(-285, f"Reading buffers have no attribute {name}")
+
+    def assign(self, name, value):
+        """
+        This function writes a buffer attribute.
+
+        :param name: (str) The attribute name, capacity or fillmode
+        :param value: The new value
+        :return: None
+        """
+        if name == "capacity":
+            self.capacity = int(value)
+            self.clear()
+        elif name == "fillmode":
+            self.fillmode = value
+        else:
+            raise _TspError(-285, f"Cannot assign reading buffer attribute "
+                                  f"{name}")
+
+    def call(self, method, args):
+        """
+        This function runs a buffer method such as clear().
+
+        :param method: (str) The method name
+        :param args: The evaluated arguments
+        :return: None
+        """
+        if method == "clear":
+            self.clear()
+            return None
+        raise _TspError(-285, f"Reading buffers have no method {method}")
+
+    def value(self, column, index):
+        """
+        This function reads one column of the reading at a buffer index.
+
+        :param column: (str) The buffer column, such as readings
+        :param index: (int) The 1-based buffer index
+        :return: The value, as a float for numeric columns
+        """
+        if not 1 <= index <= len(self._records):
+            raise _TspError(-285, f"Index {index} is outside the buffer")
+        if column not in self.stored_columns:
+            raise _TspError(-285, f"{self.style} buffers do not store "
+                                  f"{column}")
+        (reading, source_value, status, source_status, timestamp, relative,
+         measure_func, source_func) = self._records[index - 1]
+        if column == "readings":
+            return reading
+        if column == "sourcevalues":
+            return source_value
+        if column == "statuses":
+            return status
+        if column == "sourcestatuses":
+            return source_status
+        if column == "relativetimestamps":
+            return relative
+        if column == "seconds":
+            return float(int(timestamp))
+        if column == "fractionalseconds":
+            return timestamp % 1
+        if column == "extravalues":
+            return 0.0
+        if column in ("units", "extravalueunits"):
+            return _UNITS[measure_func][0]
+        if column == "sourceunits":
+            return _UNITS[source_func][0]
+        if column in ("formattedreadings", "extraformattedvalues"):
+            return f"{reading:+.5e} {_UNITS[measure_func][1]}"
+        if column == "sourceformattedvalues":
+            return f"{source_value:+.5e} {_UNITS[source_func][1]}"
+        clock = time.localtime(int(timestamp))
+        if column == "dates":
+            return time.strftime("%m/%d/%Y", clock)
+        if column == "times":
+            return time.strftime("%H:%M:%S", clock)
+        if column == "timestamps":
+            return time.strftime("%m/%d/%Y %H:%M:%S", clock) + \
+                f".{int(timestamp % 1 * 1e9):09d}"
+        raise _TspError(-285, f"Reading buffers have no column {column}")
+
+
+class _BufferColumn:
+    # A column such as defbuffer1.readings passed to printbuffer()
+    def __init__(self, buffer, name):
+        self.buffer = buffer
+        self.name = name
+
+
+class _TriggerRun:
+    # Progress of a trigger model started with trigger.model.initiate()
+    def __init__(self, buffer, count, period, time_scale, started):
+        self.buffer = buffer
+        self.count = count
+        self.period = period
+        self.made = 0
+        self.started = started
+        self.finished = started + count * period * time_scale
+        self.epoch = time.time() + started - time.perf_counter()
+
+
+# Marks a local that did not hide a global of the same name
+_UNSET = object()
+
+
+class _TspError(Exception):
+    # Raised by the interpreter; recorded as an error event
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+
+
+def _format(value):
+    # Formats a value the way TSP print() does
+    if value is None:
+        return "nil"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, float):
+        return f"{value:.14g}"
+    if isinstance(value, SimulatedBuffer):
+        return f"buffer: {id(value):#x}"
+    return str(value)
+
+
+def _scan(text):
+    # Yields (index, character, depth) for characters outside of quotes
+    depth = 0
+    quote = None
+    for index, character in enumerate(text):
+        if quote is not None:
+            if character == quote:
+                quote = None
+            continue
+        if character in "\"'":
+            quote = character
+        elif character in "([{":
+            depth += 1
+        elif character in ")]}":
+            depth -= 1
+        yield index, character, depth
+
+
+def _depth(text):
+    # Returns the bracket depth left open at the end of text
+    depth = 0
+    for _, _, depth in _scan(text):
+        pass
+    return depth
+
+
+def _strip_spaces(text):
+    # Removes whitespace outside of quoted strings
+    kept = []
+    quote = None
+    for character in text:
+        if quote is not None:
+            if character == quote:
+                quote = None
+        elif character in "\"'":
+            quote = character
+        elif character.isspace():
+            continue
+        kept.append(character)
+    return "".join(kept)
+
+
+def _split_statements(line):
+    # Splits a line holding several statements, such as
+    # "format.data = format.REAL64 format.byteorder = format.LITTLEENDIAN"
+    tokens = []
+    start = 0
+    for index, character, depth in _scan(line + " "):
+        if depth == 0 and (character.isspace() or character == ";"):
+            if index > start:
+                tokens.append(line[start:index])
+            start = index + 1
+
+    statements = []
+    for token in tokens:
+        # Operators join their operands back into one statement
+        if statements and (token[0] in "=([.,+-*/<>~" or
+                           statements[-1][-1] in "=.,+-*/<>"):
+            statements[-1] += token
+        elif statements and statements[-1] == "local":
+            statements[-1] += " " + token
+        else:
+            statements.append(token)
+    return statements
+
+
+def _split_assignment(statement):
+    for index, character, depth in _scan(statement):
+        if depth == 0 and character == "=" and \
+           statement[index + 1:index + 2] != "=" and \
+           statement[index - 1:index] not in ("=", "~", "<", ">"):
+            return statement[:index], statement[index + 1:]
+    return None, None
+
+
+def _split_comparison(text):
+    # Splits text on its first comparison operator outside of nested calls
+    # and quotes, returning (left, operator, right), or None without one
+    for index, _, depth in _scan(text):
+        match = _COMPARISON.match(text, index)
+        if depth == 0 and match is not None:
+            return text[:index], match.group(), text[match.end():]
+    return None
+
+
+def _split_on(text, separator):
+    # Splits text on the separators outside of nested calls and quotes
+    parts = []
+    start = 0
+    for index, character, depth in _scan(text):
+        if depth == 0 and character == separator:
+            parts.append(text[start:index])
+            start = index + 1
+    parts.append(text[start:])
+    return parts
+
+
+def _split_sum(text):
+    # Splits text on the binary + and - operators outside of nested calls
+    # and quotes, returning (sign, term) pairs; signs of numbers and
+    # exponents such as 1e-6 are left alone
+    terms = []
+    sign, start = "+", 0
+    for index, character, depth in _scan(text):
+        if depth != 0 or character not in "+-" or index == start:
+            continue
+        term = text[start:index]
+        if re.match(r"^(?:\d+\.?\d*|\.\d+)[eE]$", term) or \
+           not (term[-1].isalnum() or term[-1] in "_)]"):
+            continue
+        terms.append((sign, term))
+        sign, start = character, index + 1
+    terms.append((sign, text[start:]))
+    return terms
+
+
+def _split_keyword(text, keyword):
+    # Splits text on a keyword operator such as and, outside of nested calls
+    # and quotes
+    parts = []
+    start = 0
+    for index, _, depth in _scan(text):
+        if depth == 0 and text.startswith(keyword, index) and \
+           index > 0 and text[index - 1].isspace() and \
+           text[index + len(keyword):index + len(keyword) + 1].isspace():
+            parts.append(text[start:index])
+            start = index + len(keyword)
+    parts.append(text[start:])
+    return parts
+
+
+def _split_arguments(arguments):
+    # Splits a call's argument list; empty trailing arguments are dropped
+    parts = _split_on(arguments, ",")
+    while parts and not parts[-1].strip():
+        parts.pop()
+    return parts
@@ -139,9 +139,8 @@ class SourceConfiguration:
             :param list_name:
             :return:
             """
-            self._mycomms.write(f"index_count = smu.source.configlist.zier(\
-                \"{list_name}\")")
-            return int(self._mycomms.query("print(index_count)"))
+            return int(self._mycomms.query(
+                f"print(smu.source.configlist.size(\"{list_name}\"))"))
 
         def store(self, list_name, index=None):
             """
@@ -192,8 +191,7 @@ class SourceConfiguration:
 
         :return: The length of the delay
         """
-        self._mycomms.write("delay_value = smu.source.delay")
-        delay_value = float(self._mycomms.query("print(delay_value)").rstrip())
+        delay_value = float(self._mycomms.query_attribute("smu.source.delay"))
         return delay_value
 
     @delay.setter
@@ -219,8 +217,7 @@ class SourceConfiguration:
         This attribute contains the source function, which can be voltage\
         or current.
         """
-        self._mycomms.write("srcfunc = smu.source.func")
-        response = self._mycomms.query("print(srcfunc)").rstrip()
+        response = self._mycomms.query_attribute("smu.source.func")
         # retconstval = None
         if "VOLTAGE" in response:
             retconstval = _smuconst.FUNC_DC_VOLTAGE
@@ -247,8 +244,7 @@ class SourceConfiguration:
         This attribute immediately selects a fixed amplitude for the\
         selected source function.
         """
-        self._mycomms.write("srclev = smu.source.level")
-        return float(self._mycomms.query("print(srclev)").rstrip())
+        return float(self._mycomms.query_attribute("smu.source.level"))
 
     @level.setter
     def level(self, value):
@@ -271,8 +267,8 @@ class SourceConfiguration:
             This attribute selects the source limit for current\
             measurements.
             """
-            self._mycomms.write("ilimitlev = smu.source.ilimit.level")
-            return float(self._mycomms.query("print(ilimitlev)").rstrip())
+            return float(self._mycomms.query_attribute(
+                "smu.source.ilimit.level"))
 
         @level.setter
         def level(self, value):
@@ -288,8 +284,7 @@ class SourceConfiguration:
             This attribute indicates if the source exceeded the limits that\
             were set for the selected measurements.
             """
-            self._mycomms.write("ilimittrip = smu.source.ilimit.tripped")
-            return int(self._mycomms.query("print(ilimittrip)").rstrip())
+            return int(self._mycomms.query("print(smu.source.ilimit.tripped)"))
 
     @property
     def offmode(self):
@@ -311,9 +306,7 @@ class SourceConfiguration:
         :return: Either OFFMODE_NORMAL, OFFMODE_HIGHZ, OFFMODE_ZERO, or\
             OFFMODE_GUARD
         """
-        self._mycomms.write("source_off_mode = smu.source.offmode")
-        source_off_mode = self._mycomms.query("print(\
-            source_off_mode)").rstrip()
+        source_off_mode = self._mycomms.query_attribute("smu.source.offmode")
         if "NORMAL" in source_off_mode:
             return _smuconst.OFFMODE_NORMAL
         elif "HIGHZ" in source_off_mode:
@@ -361,8 +354,7 @@ class SourceConfiguration:
 
         :return: Either ON (1) or OFF (0)
         """
-        self._mycomms.write("readback_state = smu.source.readback")
-        source_readback = self._mycomms.query("print(readback_state)")
+        source_readback = self._mycomms.query_attribute("smu.source.readback")
         if "ON" in source_readback:
             return _smuconst.ON
         elif "OFF" in source_readback:
@@ -398,8 +390,8 @@ class SourceConfiguration:
             This attribute selects the source limit for voltage\
             measurements.
             """
-            self._mycomms.write("vlimitlev = smu.source.vlimit.level")
-            return float(self._mycomms.query("print(vlimitlev)").rstrip())
+            return float(self._mycomms.query_attribute(
+                "smu.source.vlimit.level"))
 
         @level.setter
         def level(self, value):
@@ -415,8 +407,7 @@ class SourceConfiguration:
             This attribute indicates if the source exceeded the limits that\
             were set for the selected measurements.
             """
-            self._mycomms.write("vlimittrip = smu.source.vlimit.tripped")
-            return int(self._mycomms.query("print(vlimittrip)").rstrip())
+            return int(self._mycomms.query("print(smu.source.vlimit.tripped)"))
 
     @property
     def output(self):
@@ -425,8 +416,7 @@ class SourceConfiguration:
 
         :return: Either ON (1) or OFF (0).
         """
-        self._mycomms.write("source_output = smu.source.output")
-        source_output = self._mycomms.query("print(source_output)")
+        source_output = self._mycomms.query_attribute("smu.source.output")
         if "ON" in source_output:
             return _smuconst.ON
         elif "OFF" in source_output:
@@ -454,8 +444,7 @@ class SourceConfiguration:
 
         :return: The applied source range.
         """
-        self._mycomms.write("range_value = smu.source.range")
-        range_value = float(self._mycomms.query("print(range_value)").rstrip())
+        range_value = float(self._mycomms.query_attribute("smu.source.range"))
         return range_value
 
     @range.setter
@@ -481,8 +470,8 @@ class SourceConfiguration:
         :return: delay_time
         """
         if delay_time is None:
-            self._mycomms.write(f"delay_time = smu.source.userdelay[{n}]")
-            delay_time = float(self._mycomms.query("print(delay_time)"))
+            delay_time = float(self._mycomms.query_attribute(
+                f"smu.source.userdelay[{n}]"))
             return delay_time
         else:
             self._mycomms.write(f"smu.source.userdelay[{n}] = {delay_time}")
@@ -58,6 +58,22 @@ class TriggerConfiguration:
             """
             self._mycomms.write("trigger.model.initiate()")
 
+        def wait_for_idle(self, timeout=None):
+            """
+            This function blocks until the trigger model and any other\
+                overlapped operations finish, in a single round trip:\
+                waitcomplete() holds the instrument's command queue until\
+                they finish and *OPC? then answers. Use it in place of\
+                polling state.
+
+            :param timeout: (float) The maximum time to wait in seconds;\
+                None waits indefinitely
+            :return: (bool) True once the instrument is idle; False if the\
+                timeout expired first
+            """
+            return self._mycomms.query_with_timeout("waitcomplete()\n*OPC?",
+                                                    timeout) is not None
+
         def load_duration_loop(self, duration, delay=None, buffer_name=None):
             """
             This function loads a trigger-model template configuration that\
@@ -848,8 +864,7 @@ class TriggerConfiguration:
             :return: Will return one of the following: ABORTED, ABORTING,\
                 BUILDING, EMPTY, FAILED, IDLE, RUNNING
             """
-            self._mycomms.write("stat, stat, n = trigger.model.state()")
-            status = self._mycomms.query("print(stat)")
+            status = self._mycomms.query("print(trigger.model.state())")
             if "ABORTED" in status:
                 return _smuconst.TRIGGER_STATE_ABORTED
             elif "ABORTING" in status:
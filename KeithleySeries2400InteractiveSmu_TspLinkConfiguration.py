@@ -42,8 +42,7 @@ class TspLinkConfiguration:
         :param: None
         :return group_number: The group number of the TSP-Link node (0 to 64)
         """
-        self._mycomms.write("group_number = tsplink.group")
-        group_number = self._mycomms.query("print(group_number)")
+        group_number = self._mycomms.query_attribute("tsplink.group")
         return group_number
 
     @group.setter
@@ -70,8 +69,7 @@ class TspLinkConfiguration:
             self._mycomms.write(f"tsplink.initialize({expected_nodes})")
             return None
         else:
-            self._mycomms.write("nodes_found = tsplink.initialize()")
-            nodes_found = self._mycomms.query("print(nodes_found)")
+            nodes_found = self._mycomms.query("print(tsplink.initialize())")
             return nodes_found
 
     class Line():
@@ -99,8 +97,8 @@ class TspLinkConfiguration:
                 self._mycomms.write(f"tsplink.line[{n}].mode = {line_mode}")
                 return None
             else:
-                self._mycomms.write("mode = tsplink.line[N].mode")
-                line_mode = self._mycomms.query("print(mode)")
+                line_mode = self._mycomms.query_attribute(
+                    f"tsplink.line[{n}].mode")
                 return line_mode
 
     @property
@@ -111,6 +109,5 @@ class TspLinkConfiguration:
         :param: None
         :return group_number: The group number of the TSP-Link node (0 to 64)
         """
-        self._mycomms.write("state = tsplink.state")
-        state = self._mycomms.query("print(state)")
+        state = self._mycomms.query("print(tsplink.state)")
         return state
@@ -0,0 +1,67 @@
+#  Copyright 2022 Joshua Brown
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+# *****************************************************************************
+#
+# Benchmark Description:
+#
+#       Compares reading a buffer back one index at a time with
+#       get_buffer_value() against the bulk printbuffer() based fetch() and
+#       the binary fetch_array(). The in-process simulated instrument, with a
+#       fixed latency on every round trip, stands in for the SMU so the
+#       benchmark runs without hardware.
+#
+# *****************************************************************************
+import time
+
+import KeithleySeries2400InteractiveSmu as KeiSmu
+import KeithleySeries2400InteractiveSmu_Simulator as simulator
+
+READING_COUNT = 2000
+ROUND_TRIP_LATENCY = 0.001     # seconds
+
+
+def report(label, count, elapsed):
+    """
+    Print the throughput of one benchmark pass.
+    """
+    print(f"{label:<24}{count:>8} readings {elapsed:>9.3f} s "
+          f"{count / elapsed:>12.1f} readings/s")
+
+
+mysmu = KeiSmu.KeithleySeries2400InteractiveSmu()
+# time_scale=0 makes the simulated measurements instantaneous, so only the
+# transfer of the readings is timed
+mysmu.instrumentcomms = simulator.SimulatedCommunications(
+    latency=ROUND_TRIP_LATENCY, time_scale=0)
+mysmu.initialize("SIM::2450::INSTR")
+mysmu.trigger.model.load_simple_loop(READING_COUNT)
+mysmu.trigger.model.initiate()
+mysmu.waitcomplete()
+
+start_time = time.perf_counter()
+for i in range(1, READING_COUNT + 1):
+    mysmu.get_buffer_value("defbuffer1", i, readings=True)
+    mysmu.get_buffer_value("defbuffer1", i, relativetimestamps=True)
+report("get_buffer_value", READING_COUNT, time.perf_counter() - start_time)
+
+start_time = time.perf_counter()
+data = mysmu.fetch("defbuffer1", columns=["readings", "relativetimestamps"])
+report("fetch", len(data["readings"]), time.perf_counter() - start_time)
+
+start_time = time.perf_counter()
+data = mysmu.fetch_array("defbuffer1",
+                         columns=["readings", "relativetimestamps"])
+report("fetch_array", len(data["readings"]), time.perf_counter() - start_time)
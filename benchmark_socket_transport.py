@@ -0,0 +1,113 @@
+#  Copyright 2022 Joshua Brown
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+#
+
+# *****************************************************************************
+#
+# Benchmark Description:
+#
+#       Measures the round trip rate of the raw socket transport. A local TCP
+#       server standing in for the instrument's TSP socket (port 5025)
+#       answers print() queries, and printbuffer() in ASCII and REAL64, so the
+#       benchmark runs without hardware. The driver picks the socket
+#       transport from the TCPIP0::<host>::<port>::SOCKET resource string.
+#
+# *****************************************************************************
+import re
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+import KeithleySeries2400InteractiveSmu as KeiSmu
+
+QUERY_COUNT = 2000
+READING_COUNT = 20000
+
+
+class StandInHandler(socketserver.StreamRequestHandler):
+    """
+    Answers the TSP commands used by this benchmark, one line at a time.
+    """
+    def setup(self):
+        super().setup()
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self):
+        binary = False
+        readings = [1.0e-9 * (i + 1) for i in range(READING_COUNT)]
+        for line in self.rfile:
+            command = line.decode().strip()
+            if command == "*IDN?":
+                self.wfile.write(b"KEITHLEY INSTRUMENTS,MODEL 2450,0,0\n")
+            elif command.startswith("format.data"):
+                binary = "REAL64" in command
+            elif re.match(r"print\(\w+\.n\)", command):
+                self.wfile.write(f"{READING_COUNT}\n".encode())
+            elif command.startswith("printbuffer"):
+                start, end = [int(value) for value in
+                              re.findall(r"\d+", command)[:2]]
+                values = readings[start - 1:end]
+                if binary:
+                    self.wfile.write(b"#0" + struct.pack(
+                        f"<{len(values)}d", *values) + b"\n")
+                else:
+                    self.wfile.write(", ".join(
+                        f"{value:.9e}" for value in values).encode() + b"\n")
+            elif command.startswith("print("):
+                self.wfile.write(b"1.000000000e+00\n")
+            self.wfile.flush()
+
+
+def report(label, count, elapsed, unit):
+    """
+    Print the throughput of one benchmark pass.
+    """
+    print(f"{label:<24}{count:>8} {unit} {elapsed:>9.3f} s "
+          f"{count / elapsed:>12.1f} {unit}/s")
+
+
+server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), StandInHandler)
+server.daemon_threads = True
+threading.Thread(target=server.serve_forever, daemon=True).start()
+port = server.server_address[1]
+
+mysmu = KeiSmu.KeithleySeries2400InteractiveSmu()
+mysmu.initialize(f"TCPIP0::127.0.0.1::{port}::SOCKET")
+print(mysmu.instrument_id_query())
+
+start_time = time.perf_counter()
+for _ in range(QUERY_COUNT):
+    mysmu.measure.nplc
+report("query", QUERY_COUNT, time.perf_counter() - start_time, "queries")
+
+start_time = time.perf_counter()
+for _ in range(QUERY_COUNT // 10):
+    mysmu.instrumentcomms.query_many(["print(smu.measure.nplc)"] * 10)
+report("query_many", QUERY_COUNT, time.perf_counter() - start_time,
+       "queries")
+
+start_time = time.perf_counter()
+data = mysmu.fetch("defbuffer1")
+report("fetch", len(data["readings"]), time.perf_counter() - start_time,
+       "readings")
+
+start_time = time.perf_counter()
+data = mysmu.fetch_array("defbuffer1")
+report("fetch_array", len(data["readings"]), time.perf_counter() - start_time,
+       "readings")
+
+mysmu.close()
+server.shutdown()